@@ -0,0 +1,106 @@
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import wcwidth
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.excel_file import ExcelFile
+
+
+def legacy_export_dataframe_to_excel(excel, dataframe, sheet_name, string_columns=None, set_width_by_value=False):
+    workbook = excel.writer.book
+    sheet = workbook.add_worksheet(sheet_name)
+    header_format = workbook.add_format({
+        'bold': True,
+        'bg_color': '#5B9BD5',
+        'font_color': '#FFFFFF'
+    })
+    fmt_time = workbook.add_format({'num_format': 'yyyy-mm-dd'})
+    row = 1
+    for i, row_data in dataframe.iterrows():
+        for col_idx, col_value in enumerate(row_data):
+            if pd.isna(col_value):
+                sheet.write(row, col_idx, None)
+            elif isinstance(col_value, pd.Timestamp):
+                sheet.write_datetime(row, col_idx, col_value.to_pydatetime(), fmt_time)
+            else:
+                col_name = dataframe.columns[col_idx]
+                if string_columns and col_name in string_columns:
+                    sheet.write_string(row, col_idx, str(col_value))
+                else:
+                    sheet.write(row, col_idx, col_value)
+        row += 1
+    worksheet = excel.writer.sheets[sheet_name]
+    columns_width = [max(len(str(col)), wcwidth.wcswidth(str(col))) + 4 for col in dataframe.columns]
+    for col_idx, col_name in enumerate(dataframe.columns):
+        if set_width_by_value:
+            max_value_length = dataframe[col_name].astype(str).str.len().max()
+            columns_width[col_idx] = max(columns_width[col_idx], max_value_length)
+        worksheet.set_column(col_idx, col_idx, columns_width[col_idx])
+        worksheet.write(0, col_idx, col_name, header_format)
+
+
+def generate_device_report(rows):
+    random = np.random.default_rng(0)
+    registered = pd.Timestamp('2020-01-01') + pd.to_timedelta(random.integers(0, 1500, rows), unit='D')
+    df = pd.DataFrame({
+        'Email': [f'user{i % 20000}@example.com' for i in range(rows)],
+        'Name': [f'DEVICE-{i:06d}' for i in range(rows)],
+        'Enabled': random.choice(['Yes', 'No'], rows),
+        'OS': random.choice(['MacMDM', 'iOS', 'Android', 'Linux'], rows),
+        'Version': random.choice(['14.1', '17.2.1', '13', None], rows),
+        'Compliant': random.choice([True, False], rows),
+        'Score': random.random(rows),
+        'Registered': registered,
+    })
+    df.loc[df.sample(frac=0.05, random_state=0).index, 'Score'] = np.nan
+    return df
+
+
+def run(export, df, constant_memory=False):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir, 'device_list.xlsx')
+        start = time.perf_counter()
+        with ExcelFile(path.name, path, constant_memory=constant_memory) as excel:
+            export(excel, df)
+        elapsed = time.perf_counter() - start
+        parts = None
+        if len(df) <= 2000:
+            with zipfile.ZipFile(path) as archive:
+                parts = {name: archive.read(name) for name in archive.namelist() if name != 'docProps/core.xml'}
+            parts['device_list'] = pd.read_excel(path)
+    return elapsed, parts
+
+
+def main(rows=100000):
+    df = generate_device_report(rows)
+    legacy = lambda excel, data: legacy_export_dataframe_to_excel(excel, data, 'device_list', ['Version'], True)
+    current = lambda excel, data: excel.export_dataframe_to_excel(data, 'device_list', ['Version'], True)
+
+    sample = df.head(2000)
+    _, legacy_parts = run(legacy, sample)
+    _, current_parts = run(current, sample)
+    _, constant_memory_parts = run(current, sample, constant_memory=True)
+    for name, content in legacy_parts.items():
+        if name != 'device_list':
+            assert current_parts[name] == content, f'{name} differs from the legacy writer output'
+    pd.testing.assert_frame_equal(legacy_parts['device_list'], constant_memory_parts['device_list'])
+
+    legacy_elapsed, _ = run(legacy, df)
+    current_elapsed, _ = run(current, df)
+    constant_memory_elapsed, _ = run(current, df, constant_memory=True)
+    print(f'rows: {rows}')
+    print(f'legacy iterrows writer: {legacy_elapsed:.3f} s')
+    print(f'column writer: {current_elapsed:.3f} s ({legacy_elapsed / current_elapsed:.1f}x)')
+    print(f'column writer, constant_memory: {constant_memory_elapsed:.3f} s '
+          f'({legacy_elapsed / constant_memory_elapsed:.1f}x)')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,73 @@
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytz
+
+ROOT_PATH = Path(__file__).resolve().parents[1]
+HEAVY_MODULES = ['pandas', 'openpyxl', 'xlsxwriter', 'selenium', 'pytest', 'allure', 'bs4', 'webdriver_manager']
+
+
+def get_idle_job_list():
+    timezone = pytz.timezone(os.environ['SCHEDULER_TIMEZONE']) if os.environ.get('SCHEDULER_TIMEZONE') else None
+    not_due = datetime.datetime.now(timezone) + datetime.timedelta(hours=12)
+    return json.dumps([{'job_name': 'test_download_mem_report', 'cron': f'{not_due.minute} {not_due.hour} * * *',
+                        'base_url': 'https://localhost/'}])
+
+
+def run_idle_startup():
+    env = dict(os.environ, JOB_LIST=get_idle_job_list())
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-X', 'importtime', str(Path(ROOT_PATH, 'export_mem_data.py'))],
+                               cwd=ROOT_PATH, env=env, capture_output=True, text=True)
+    elapsed = (time.perf_counter() - start) * 1000
+    if completed.returncode != 0:
+        print(completed.stderr)
+        sys.exit(completed.returncode)
+    return elapsed, parse_importtime(completed.stderr)
+
+
+def parse_importtime(output):
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative) / 1000
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the "nothing to do" startup of export_mem_data.py')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-ms', type=float, default=500, help='fail when the median wall time is above this')
+    args = parser.parse_args()
+
+    results = [run_idle_startup() for _ in range(args.runs)]
+    wall_times = sorted(elapsed for elapsed, _ in results)
+    median = wall_times[len(wall_times) // 2]
+    modules = results[-1][1]
+    print(f'wall time: median {median:.1f} ms, min {wall_times[0]:.1f} ms over {args.runs} run(s)')
+    print('slowest imports (cumulative):')
+    for name, cumulative in sorted(modules.items(), key=lambda item: item[1], reverse=True)[:10]:
+        print(f'  {cumulative:8.1f} ms  {name}')
+
+    heavy_modules = [name for name in modules if name.split('.')[0] in HEAVY_MODULES]
+    failures = []
+    if heavy_modules:
+        failures.append(f'heavy modules imported: {", ".join(sorted({name.split(".")[0] for name in heavy_modules}))}')
+    if median > args.max_ms:
+        failures.append(f'median wall time {median:.1f} ms is above {args.max_ms} ms')
+    if failures:
+        print('\n'.join(failures))
+        sys.exit(1)
+    print('Startup without due jobs imports no heavy modules')
+
+
+if __name__ == '__main__':
+    main()
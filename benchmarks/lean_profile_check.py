@@ -0,0 +1,158 @@
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.config import config
+from utils.driver_factory import DriverFactory
+
+TELEMETRY_HOST = 'telemetry.localhost'
+RESOURCES = {
+    'image': 'pixel.png',
+    'font': 'font.woff2',
+    'media': 'clip.mp4',
+    'script': 'app.js',
+    'telemetry': 'track',
+    'frame': 'frame.html',
+    'frame font': 'frame-font.woff2',
+    'frame telemetry': 'frame-track'
+}
+LOADED_IN_LEAN_PROFILE = ['script', 'frame']
+PAGE = '''<!DOCTYPE html>
+<html>
+<head>
+<style>
+@font-face {{ font-family: 'Portal'; src: url('/font.woff2') format('woff2'); }}
+body {{ font-family: 'Portal', sans-serif; }}
+</style>
+<script src="/app.js"></script>
+</head>
+<body>
+<img src="/pixel.png">
+<video src="/clip.mp4" preload="auto" autoplay muted></video>
+<iframe src="{frame_url}"></iframe>
+<div id="result">crawl-result</div>
+<script>
+window.addEventListener('load', () => {{
+    fetch('{telemetry_url}/track', {{method: 'POST', body: 'event', mode: 'no-cors'}}).catch(() => {{}});
+}});
+</script>
+</body>
+</html>
+'''
+FRAME = '''<!DOCTYPE html>
+<html>
+<head>
+<style>
+@font-face {{ font-family: 'Blade'; src: url('/frame-font.woff2') format('woff2'); }}
+body {{ font-family: 'Blade', sans-serif; }}
+</style>
+</head>
+<body>
+<div>blade</div>
+<script>
+fetch('{telemetry_url}/frame-track', {{method: 'POST', body: 'event', mode: 'no-cors'}}).catch(() => {{}});
+</script>
+</body>
+</html>
+'''
+GET_PAGE_STATE_SCRIPT = '''
+const navigation = performance.getEntriesByType('navigation')[0];
+return {
+    result: document.getElementById('result').textContent,
+    load: navigation ? navigation.loadEventEnd - navigation.startTime : null,
+    memory: performance.memory ? performance.memory.usedJSHeapSize : null
+};
+'''
+
+
+class RecordingHandler(SimpleHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        RecordingHandler.requests.append(self.path.lstrip('/').split('?')[0])
+        super().do_GET()
+
+    def do_POST(self):
+        RecordingHandler.requests.append(self.path.lstrip('/').split('?')[0])
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def create_site(directory, frame_url, telemetry_url):
+    Path(directory, 'index.html').write_text(PAGE.format(frame_url=frame_url, telemetry_url=telemetry_url),
+                                             encoding='UTF-8')
+    Path(directory, 'frame.html').write_text(FRAME.format(telemetry_url=telemetry_url), encoding='UTF-8')
+    Path(directory, 'app.js').write_text('window.appLoaded = true;', encoding='UTF-8')
+    for name in ['pixel.png', 'font.woff2', 'clip.mp4', 'frame-font.woff2']:
+        Path(directory, name).write_bytes(b'\0' * 1024)
+
+
+def load_page(browser, url, lean):
+    config.BROWSER_LEAN_PROFILE = lean
+    RecordingHandler.requests.clear()
+    driver = DriverFactory.get_driver(browser, headless_mode=True)
+    try:
+        driver.get(url)
+        time.sleep(2)
+        state = driver.execute_script(GET_PAGE_STATE_SCRIPT)
+    finally:
+        driver.quit()
+    state['requests'] = list(RecordingHandler.requests)
+    return state
+
+
+def is_loaded(state, name):
+    return name in state['requests']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Show which requests the lean browser profile blocks')
+    parser.add_argument('--browser', default=config.BROWSER_LIST[0], choices=['chrome', 'firefox', 'edge'])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        server = ThreadingHTTPServer(('127.0.0.1', 0), partial(RecordingHandler, directory=directory))
+        port = server.server_address[1]
+        frame_url = f'http://127.0.0.1:{port}/frame.html'
+        telemetry_url = f'http://{TELEMETRY_HOST}:{port}'
+        config.BROWSER_BLOCKED_HOSTS = config.BROWSER_BLOCKED_HOSTS + [TELEMETRY_HOST]
+        create_site(directory, frame_url, telemetry_url)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://localhost:{port}/index.html'
+        try:
+            states = {lean: load_page(args.browser, url, lean) for lean in [False, True]}
+        finally:
+            server.shutdown()
+
+    print(f'{"resource":<16}{"default":>10}{"lean":>10}')
+    failures = []
+    for name, path in RESOURCES.items():
+        loaded = [is_loaded(states[lean], path) for lean in [False, True]]
+        print(f'{name:<16}{"loaded" if loaded[0] else "blocked":>10}{"loaded" if loaded[1] else "blocked":>10}')
+        if not loaded[0] or loaded[1] != (name in LOADED_IN_LEAN_PROFILE):
+            failures.append(name)
+    for label, key, unit in [('load time', 'load', 'ms'), ('JS heap', 'memory', 'bytes')]:
+        values = [states[lean][key] for lean in [False, True]]
+        if None not in values:
+            print(f'{label:<16}{round(values[0]):>10}{round(values[1]):>10} {unit}')
+    if states[False]['result'] != states[True]['result']:
+        failures.append('result')
+    if failures:
+        print(f'Lean profile check failed for: {", ".join(failures)}')
+        sys.exit(1)
+    print('Lean profile blocks images, fonts, media and telemetry, also inside cross-origin frames, '
+          'and keeps the page result unchanged')
+
+
+if __name__ == '__main__':
+    main()
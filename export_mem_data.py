@@ -1,32 +1,60 @@
+import argparse
 import os
 
-import pytest
-
 from utils.config import config
 from utils.cron_selector import get_jobs_to_run
-from utils.excel_file import ExcelFile
-from utils.logger import Logger
-from utils.random_generator import random_browser
 
 
 def clean_email(email: str):
     return email.lower().strip()
 
 
-def get_email_list_str():
+def get_email_list():
+    from utils.excel_file import ExcelFile
+
     data_path = config.EMAIL_LIST_FILE_PATH
-    df = ExcelFile(data_path.name, data_path).import_excel_to_dataframe()
-    email_list = df['Email'].tolist()
-    cleaned_email_list = [clean_email(item) for item in email_list]
-    return ','.join(cleaned_email_list)
+    df = ExcelFile(data_path.name, data_path).import_excel_to_dataframe(columns=['Email'])
+    email_list = df['Email'].dropna().astype(str).map(clean_email)
+    return email_list[email_list != ''].drop_duplicates()
 
 
-def main():
-    email_list_str = get_email_list_str()
+def parse_args():
+    parser = argparse.ArgumentParser(description='Export device data of mem users')
+    parser.add_argument('--scheduler', action='store_true',
+                        help='stay resident and run jobs of JOB_LIST on their cron schedule')
+    parser.add_argument('--jobs', default=None, help='comma separated job names to run now, skipping cron matching')
+    return parser.parse_args()
+
+
+def run_jobs(jobs_to_run):
+    import pytest
+
+    from utils import crawler
+    from utils.browser_daemon import is_daemon_available, submit_to_daemon
+    from utils.locator_latency import locator_latency
+    from utils.logger import Logger
+    from utils.metrics import metrics
+    from utils.random_generator import random_browser
+    from utils.tracer import tracer
+    from utils.work_queue import WorkQueue
+
+    email_queue = WorkQueue()
+    email_queue.populate(get_email_list())
 
-    jobs_to_run = get_jobs_to_run(config.JOB_LIST)
     mem_list = [element for element in jobs_to_run if "mem" in element]
     Logger().info(f"Running jobs: {', '.join(mem_list)}")
+    if 'test_download_mem_report' in jobs_to_run and config.DEVICE_COLLECTION_MODE != 'bulk' and \
+            config.DAEMON_ENABLED and is_daemon_available():
+        Logger().info(f'Submitting {email_queue.count()} email(s) in {email_queue.path} to the browser daemon')
+        try:
+            device_list = submit_to_daemon(email_queue.path)
+        except Exception as exception:
+            Logger().error(f'* Browser daemon crawl failed, running the job in this process instead: {exception}')
+        else:
+            if len(device_list):
+                crawler.generate_report(device_list)
+            jobs_to_run.remove('test_download_mem_report')
+            mem_list = [element for element in jobs_to_run if "mem" in element]
     if jobs_to_run:
         random_browser()
         pytest.main(
@@ -37,8 +65,25 @@ def main():
              '--cache-clear',
              '-k', ' or '.join(mem_list),
              '-s',
-             f'--email-list={email_list_str}']
+             f'--email-queue={email_queue.path}']
         )
+        locator_latency.save()
+        metrics_path = metrics.dump()
+        Logger().info(f'Step metrics written to {metrics_path} and {config.METRICS_PROMETHEUS_FILE_PATH}')
+        if tracer.enabled:
+            Logger().info(f'Trace written to {tracer.dump()}')
+
+
+def main():
+    args = parse_args()
+    if args.scheduler:
+        from utils.scheduler import JobScheduler
+        JobScheduler().start()
+        return
+
+    jobs_to_run = args.jobs.split(',') if args.jobs else get_jobs_to_run(config.JOB_LIST)
+    if jobs_to_run:
+        run_jobs(jobs_to_run)
 
 
 if __name__ == '__main__':
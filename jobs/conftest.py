@@ -5,6 +5,7 @@ import pytest
 from utils.config import config
 from utils.driver_factory import DriverFactory
 from utils.screenshot import Screenshot
+from utils.work_queue import WorkQueue
 
 
 @pytest.fixture(scope='class')
@@ -29,14 +30,14 @@ def screenshot_on_failure(request):
     if request.node.rep_setup.passed and request.node.rep_call.failed:
         current_test = request.node.name.split(':')[-1].split(' ')[0].lower()
         driver = request.cls.driver
-        Screenshot.take_screenshot(driver, 'test call failed', test=current_test)
+        Screenshot.take_screenshot(driver, 'test call failed', test=current_test, force=True)
 
 
 def pytest_addoption(parser):
-    parser.addoption('--email-list', action='store', dest='email_list_str', default=None,
-                     help='users emails list')
+    parser.addoption('--email-queue', action='store', dest='email_queue_path', default=None,
+                     help='path of the users emails work queue')
 
 
 @pytest.fixture
-def email_list_str(request):
-    return request.config.option.email_list_str
+def email_queue(request):
+    return WorkQueue(request.config.option.email_queue_path)
@@ -1,13 +1,10 @@
 import allure
-import pandas as pd
 import pytest
 
-from pages.locators import LoginPageLocators, HomePageLocators
-from pages.login_page import LoginPage
-from pages.user_page import UserPage
+from utils import crawler
 from utils.config import config
-from utils.excel_file import ExcelFile
-from utils.logger import Logger
+from utils.device_export import join_devices_to_emails
+from utils.run_journal import RunJournal
 from utils.utils import get_base_url_by_job_name, get_current_function_name
 
 
@@ -16,36 +13,23 @@ class TestSiteCrawler:
     reruns = config.JOB_RERUNS
     reruns_delay = config.JOB_RERUNS_DELAY
 
-    def generate_report(self, device_list):
-        df = pd.DataFrame(device_list)
-        column_mapping = config.DEVICE_COLUMN_MAPPING
-        df.rename(columns=column_mapping, inplace=True)
-        email_column = df.pop('Email')
-        df.insert(0, 'Email', email_column)
+    def collect_device_list_in_parallel(self, base_url, email_queue):
+        return crawler.collect_device_list_in_parallel(self.driver, base_url, email_queue, RunJournal())
 
-        os_to_exclude = config.DEVICE_OS_TO_EXCLUDE
-        df_filtered = df[~df['OS'].isin(os_to_exclude)]
-
-        report_path = config.DEVICE_LIST_FILE_PATH
-        with ExcelFile(report_path.name, report_path) as excel:
-            excel.export_dataframe_to_excel(df_filtered, 'device_list', set_width_by_value=True)
+    def collect_device_list_in_bulk(self, base_url, email_queue):
+        user_page = crawler.login(self.driver, base_url)
+        device_list_path = user_page.download_device_list()
+        return join_devices_to_emails(device_list_path, list(email_queue))
 
     @pytest.mark.usefixtures('screenshot_on_failure')
     @pytest.mark.flaky(reruns=reruns, reruns_delay=reruns_delay)
     @allure.title('Download mem report test')
     @allure.description('This is test of download mem report')
-    def test_download_mem_report(self, email_list_str):
+    def test_download_mem_report(self, email_queue):
         base_url = get_base_url_by_job_name(config.JOB_LIST, get_current_function_name())
-        user_page = UserPage(self.driver, base_url)
-        user_page.open_page(wait_element=LoginPageLocators.msft_logo_img)
-        login_page = LoginPage(self.driver, base_url)
-        login_page.login(user='mem', wait_element=HomePageLocators.msft_user_info_button)
-        device_list = []
-        for email in email_list_str.split(','):
-            user_id = user_page.get_user_id(email=email)
-            Logger().info(msg=f"Email: {email}, User ID: {user_id}")
-            if user_id:
-                device_info = user_page.get_device_info(email=email, user_id=user_id)
-                device_list.extend(device_info)
-        if device_list:
-            self.generate_report(device_list)
+        if config.DEVICE_COLLECTION_MODE == 'bulk':
+            device_list = self.collect_device_list_in_bulk(base_url, email_queue)
+        else:
+            device_list = self.collect_device_list_in_parallel(base_url, email_queue)
+        if len(device_list):
+            crawler.generate_report(device_list)
@@ -6,6 +6,7 @@ from utils.users import User
 class PageLocators(object):
     body = (By.XPATH, '//body')
     html = (By.TAG_NAME, 'html')
+    blade_frame = (By.XPATH, '//iframe[contains(@name, ".ReactView")]')
 
 
 class HomePageLocators(PageLocators):
@@ -49,4 +50,7 @@ class UserPageLocators(PageLocators):
     user_profile = (By.XPATH, '//iframe[contains(@name, "UserProfile.ReactView")]')
     user_email = (
         By.XPATH, '//div[contains(@class, "ms-Persona-details")]/div[contains(@class, "ms-Persona-secondary")]/div')
+    all_devices_title = (By.XPATH, '//h2[contains(text(),"Devices")]')
+    download_devices_button = (By.XPATH, '//button[.//span[contains(text(),"Download devices")]]')
+    start_download_button = (By.XPATH, '//button[.//span[contains(text(),"Start download")]]')
     home_title = (By.XPATH, '//h2[contains(text(),"Thermo Fisher")]')
@@ -1,9 +1,11 @@
 import os
 import time
 from pathlib import Path
+from urllib.parse import unquote
 
 import allure
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, JavascriptException, \
+    StaleElementReferenceException
 from selenium.webdriver import ActionChains
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support import expected_conditions as EC
@@ -11,8 +13,126 @@ from selenium.webdriver.support.wait import WebDriverWait
 
 from pages.locators import PageLocators
 from utils.config import config
+from utils.locator_latency import locator_latency
 from utils.logger import _step, Logger
+from utils.metrics import metrics
 from utils.screenshot import Screenshot
+from utils.tracer import traced, tracer
+
+HASH_NAVIGATION_TIMEOUT = 5
+WAIT_FOR_CONDITIONS_SCRIPT = '''
+const [conditions, timeout, callback] = arguments;
+
+function findElements(by, value) {
+    switch (by) {
+        case 'xpath': {
+            const result = document.evaluate(value, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            return Array.from({length: result.snapshotLength}, (_, i) => result.snapshotItem(i));
+        }
+        case 'id': {
+            const element = document.getElementById(value);
+            return element ? [element] : [];
+        }
+        case 'tag name':
+            return Array.from(document.getElementsByTagName(value));
+        case 'class name':
+            return Array.from(document.getElementsByClassName(value));
+        case 'name':
+            return Array.from(document.getElementsByName(value));
+        case 'css selector':
+            return Array.from(document.querySelectorAll(value));
+        default:
+            throw new Error(`Unsupported locator strategy: ${by}`);
+    }
+}
+
+function isVisible(element) {
+    const style = getComputedStyle(element);
+    if (style.display === 'none' || style.visibility === 'hidden' || style.opacity === '0') {
+        return false;
+    }
+    const rect = element.getBoundingClientRect();
+    return rect.width > 0 && rect.height > 0;
+}
+
+function isFrameReady(element) {
+    try {
+        return !element.contentDocument || element.contentDocument.readyState !== 'loading';
+    } catch (error) {
+        return true;
+    }
+}
+
+function check(condition) {
+    const elements = findElements(condition.by, condition.value);
+    const element = elements[0];
+    switch (condition.type) {
+        case 'present':
+            return elements.length > 0;
+        case 'visible':
+            return !!element && isVisible(element);
+        case 'clickable':
+            return !!element && isVisible(element) && !element.disabled;
+        case 'invisible':
+            return !element || !isVisible(element);
+        case 'frame':
+            return !!element && isVisible(element) && isFrameReady(element);
+        case 'text_present':
+            return !!element && element.innerText.includes(condition.text);
+        case 'text_changed': {
+            const text = element ? element.innerText.trim() : '';
+            return !!text && text !== condition.text;
+        }
+        default:
+            throw new Error(`Unsupported condition: ${condition.type}`);
+    }
+}
+
+function evaluate() {
+    return conditions.findIndex(check);
+}
+
+const first = evaluate();
+if (first >= 0) {
+    callback(first);
+    return;
+}
+let done = false;
+let scheduled = false;
+const finish = result => {
+    if (done) {
+        return;
+    }
+    done = true;
+    observer.disconnect();
+    clearTimeout(timer);
+    clearInterval(interval);
+    callback(result);
+};
+const recheck = () => {
+    scheduled = false;
+    if (done) {
+        return;
+    }
+    try {
+        const index = evaluate();
+        if (index >= 0) {
+            finish(index);
+        }
+    } catch (error) {
+        finish(-2);
+    }
+};
+const observer = new MutationObserver(() => {
+    if (!scheduled) {
+        scheduled = true;
+        setTimeout(recheck, 0);
+    }
+});
+observer.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+const interval = setInterval(recheck, 250);
+const timer = setTimeout(() => finish(-1), timeout);
+'''
 
 
 class Page(object):
@@ -35,14 +155,41 @@ class Page(object):
         return True
 
     @_step
+    @traced()
     @allure.step('Opening the page')
-    def open_page(self, url='', is_overwrite=False, wait_element=None):
+    def open_page(self, url='', is_overwrite=False, wait_element=None, force_reload=False):
         if is_overwrite:
             self.driver.get(url)
+        elif config.NAVIGATION_MODE == 'hash' and not force_reload and self.navigate_by_hash(url):
+            metrics.increment('navigation', mode='hash')
         else:
+            metrics.increment('navigation', mode='reload')
             self.driver.get(f'{self.base_url}{url}')
         if wait_element is not None:
             self.wait_element_to_be_visible(*wait_element)
+            tracer.record_browser_timing(self.driver, url)
+
+    def navigate_by_hash(self, url):
+        if not url.startswith('#') or not self.driver.current_url.startswith(self.base_url):
+            return False
+        self.driver.switch_to.default_content()
+        current_hash = self.driver.execute_script('return window.location.hash;')
+        if unquote(current_hash) == unquote(url):
+            return False
+        previous_frames = self.driver.find_elements(*self.locator.blade_frame)
+        self.driver.execute_script('window.location.hash = arguments[0];', url)
+        if previous_frames and not self.wait_elements_to_be_stale(previous_frames, HASH_NAVIGATION_TIMEOUT):
+            Logger().info(f'Previous blade still attached after changing the hash to {url}, reloading instead')
+            return False
+        return True
+
+    def wait_elements_to_be_stale(self, elements, timeout):
+        try:
+            WebDriverWait(self.driver, timeout=timeout).until(
+                lambda driver: all(EC.staleness_of(element)(driver) for element in elements))
+        except TimeoutException:
+            return False
+        return True
 
     @allure.step('Getting title of the page')
     def get_title(self):
@@ -94,43 +241,131 @@ class Page(object):
         elif direction == 'down':
             html.send_keys(Keys.END)
 
+    def get_polling_condition(self, condition):
+        condition_type, locator = condition[0], condition[1]
+        if condition_type == 'present':
+            return EC.presence_of_element_located(locator)
+        if condition_type == 'visible':
+            return EC.visibility_of_element_located(locator)
+        if condition_type == 'clickable':
+            return EC.element_to_be_clickable(locator)
+        if condition_type == 'invisible':
+            return EC.invisibility_of_element_located(locator)
+        if condition_type == 'frame':
+            return EC.frame_to_be_available_and_switch_to_it(locator)
+        if condition_type == 'text_present':
+            return EC.text_to_be_present_in_element(locator, condition[2])
+        if condition_type == 'text_changed':
+            return lambda driver: self.element_text_changed(locator, condition[2])
+        raise ValueError(f'Unsupported wait condition: {condition_type}')
+
+    def element_text_changed(self, locator, expected_text):
+        element = self.find_element(*locator)
+        current_text = element.text.strip()
+        return current_text and current_text != expected_text
+
+    def poll_for_conditions(self, conditions, timeout):
+        polling_conditions = [self.get_polling_condition(condition) for condition in conditions]
+
+        def any_condition(driver):
+            for index, polling_condition in enumerate(polling_conditions):
+                try:
+                    if polling_condition(driver):
+                        return index + 1
+                except (NoSuchElementException, StaleElementReferenceException):
+                    continue
+            return False
+
+        return WebDriverWait(self.driver, timeout=timeout).until(any_condition) - 1
+
+    def set_script_timeout(self, timeout):
+        if getattr(self.driver, 'wait_script_timeout', 0) < timeout:
+            self.driver.set_script_timeout(timeout)
+            self.driver.wait_script_timeout = timeout
+
+    def wait_for_conditions(self, conditions, timeout=None, default_timeout=None):
+        if not timeout:
+            timeout = locator_latency.get_timeout(conditions[0][0], conditions[0][1]) or default_timeout or self.timeout
+        start = time.monotonic()
+        try:
+            index = self.wait_for_conditions_until(conditions, timeout)
+        except TimeoutException:
+            for condition in conditions:
+                locator_latency.record_timeout(condition[0], condition[1])
+            raise
+        locator_latency.record(conditions[index][0], conditions[index][1], time.monotonic() - start)
+        return index
+
+    def wait_for_conditions_until(self, conditions, timeout):
+        if config.WAIT_ENGINE == 'observer':
+            script_conditions = [{'type': condition[0], 'by': condition[1][0], 'value': condition[1][1],
+                                  'text': condition[2] if len(condition) > 2 else None} for condition in conditions]
+            start = time.monotonic()
+            try:
+                self.set_script_timeout(timeout + 5)
+                index = self.driver.execute_async_script(WAIT_FOR_CONDITIONS_SCRIPT, script_conditions,
+                                                         timeout * 1000)
+            except JavascriptException:
+                index = -2
+            if index == -1:
+                raise TimeoutException(f'None of the conditions met within {timeout} seconds: {conditions}')
+            if index >= 0:
+                condition_type, locator = conditions[index][0], conditions[index][1]
+                if condition_type == 'frame':
+                    self.driver.switch_to.frame(self.find_element(*locator))
+                return index
+            timeout = max(timeout - (time.monotonic() - start), 0.5)
+        return self.poll_for_conditions(conditions, timeout)
+
+    def wait_for_any(self, outcomes: dict, timeout=None, default_timeout=None):
+        names = list(outcomes)
+        try:
+            index = self.wait_for_conditions([outcomes[name] for name in names], timeout, default_timeout)
+        except TimeoutException:
+            return None
+        return names[index]
+
+    @traced()
     def wait_element(self, *locator):
         try:
-            WebDriverWait(self.driver, timeout=self.timeout).until(EC.presence_of_element_located(locator))
+            self.wait_for_conditions([('present', locator)])
         except TimeoutException:
             Logger().error(f'* Element not found within {self.timeout} seconds! --> {locator[1]}')
             Screenshot.take_screenshot(self.driver, f'{locator[1]} not found')
 
+    @traced()
     def wait_element_to_be_clickable(self, *locator, timeout: int = None):
-        if not timeout:
-            timeout = self.timeout
         try:
-            WebDriverWait(self.driver, timeout=timeout).until(EC.element_to_be_clickable(locator))
+            self.wait_for_conditions([('clickable', locator)], timeout)
         except TimeoutException:
-            Logger().error(f'* Element not clickable within {timeout} seconds! --> {locator[1]}')
+            Logger().error(f'* Element not clickable within {timeout or self.timeout} seconds! --> {locator[1]}')
             Screenshot.take_screenshot(self.driver, f'{locator[1]} not found')
 
+    @traced()
     def wait_element_to_be_visible(self, *locator):
         try:
-            WebDriverWait(self.driver, timeout=self.timeout).until(EC.visibility_of_element_located(locator))
+            self.wait_for_conditions([('visible', locator)])
         except TimeoutException:
             Logger().error(f'* Element not visible within {self.timeout} seconds! --> {locator[1]}')
             Screenshot.take_screenshot(self.driver, f'{locator[1]} not found')
 
+    @traced()
     def wait_element_to_be_invisible(self, *locator):
         try:
-            WebDriverWait(self.driver, timeout=self.timeout).until(EC.invisibility_of_element_located(locator))
+            self.wait_for_conditions([('invisible', locator)])
         except TimeoutException:
             Logger().error(f'* Element not invisible within {self.timeout} seconds! --> {locator[1]}')
             Screenshot.take_screenshot(self.driver, f'{locator[1]} not disappeared')
 
+    @traced()
     def wait_text_to_be_display(self, text, *locator):
         try:
-            WebDriverWait(self.driver, timeout=self.timeout).until(EC.text_to_be_present_in_element(locator, text))
+            self.wait_for_conditions([('text_present', locator, text)])
         except TimeoutException:
             Logger().error(f'* {text} not display within {self.timeout} seconds! --> {locator[1]}')
             Screenshot.take_screenshot(self.driver, f'{text} not display')
 
+    @traced()
     def wait_url_changed_to(self, url):
         try:
             WebDriverWait(self.driver, timeout=self.timeout).until(EC.url_contains(url))
@@ -139,18 +374,21 @@ class Page(object):
                 f'* URL not changed to {url} within {self.timeout} seconds! --> current URL is {self.get_url()}')
             Screenshot.take_screenshot(self.driver, f'url not changed to {url}')
 
+    @traced()
     def wait_frame_to_be_visible(self, *locator):
         try:
-            WebDriverWait(self.driver, timeout=self.timeout).until(EC.frame_to_be_available_and_switch_to_it(locator))
+            self.wait_for_conditions([('frame', locator)])
         except TimeoutException:
             Logger().error(f'* Frame not visible within {self.timeout} seconds! --> {locator[1]}')
             Screenshot.take_screenshot(self.driver, f'{locator[1]} not found')
 
+    @traced()
     def wait_element_to_be_visible_in_frame(self, frame_locator, element_locator):
         frame = self.find_element(*frame_locator)
         self.driver.switch_to.frame(frame)
         self.wait_element_to_be_visible(*element_locator)
 
+    @traced()
     def wait_file_presence(self, file_path):
         try:
             WebDriverWait(self.driver, timeout=self.timeout).until(lambda driver: os.path.exists(file_path))
@@ -158,6 +396,7 @@ class Page(object):
             Logger().error(f'* {file_path} not appear within {self.timeout} seconds!')
 
     @_step
+    @traced()
     @allure.step('Wait for download')
     def wait_for_download_completion(self, file_path: Path, file_extension=None, timeout=500):
         if file_extension is None:
@@ -1,15 +1,95 @@
+import os
 import re
+from urllib.parse import unquote
 
 import allure
 from bs4 import BeautifulSoup
-from selenium.common import TimeoutException, NoSuchElementException
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.wait import WebDriverWait
+from selenium.common import TimeoutException, NoSuchElementException, WebDriverException
 
-from pages.locators import UserPageLocators
+from pages.locators import UserPageLocators, HomePageLocators
 from pages.page import Page
-from utils.logger import _step
+from utils.config import config
+from utils.logger import _step, Logger
+from utils.retry import retry_attempts, circuit_breaker
 from utils.screenshot import Screenshot
+from utils.tracer import traced, tracer
+from utils.user_id_cache import UserIdCache
+
+USER_NOT_FOUND = ''
+HARVEST_DEVICE_DETAILS_SCRIPT = '''
+const [expectedCount, maxMilliseconds, callback] = arguments;
+const deadline = Date.now() + maxMilliseconds;
+const details = new Map();
+
+function getDetail(row) {
+    const detail = {};
+    row.querySelectorAll('div.ms-DetailsRow-cell').forEach(cell => {
+        const walker = document.createTreeWalker(cell, NodeFilter.SHOW_TEXT);
+        const texts = [];
+        while (walker.nextNode()) {
+            const text = walker.currentNode.nodeValue.trim();
+            if (text) {
+                texts.push(text);
+            }
+        }
+        detail[cell.getAttribute('data-automation-key')] = texts.join('');
+    });
+    return detail;
+}
+
+function collect() {
+    let added = 0;
+    document.querySelectorAll('div.ms-DetailsRow-fields').forEach(row => {
+        const detail = getDetail(row);
+        const indexed = row.closest('[aria-rowindex]');
+        const key = indexed ? indexed.getAttribute('aria-rowindex') : JSON.stringify(detail);
+        if (!details.has(key)) {
+            details.set(key, detail);
+            added++;
+        }
+    });
+    return added;
+}
+
+function getScrollContainer() {
+    let element = document.querySelector('div.ms-DetailsRow-fields');
+    while (element) {
+        const overflowY = getComputedStyle(element).overflowY;
+        if ((overflowY === 'auto' || overflowY === 'scroll') && element.scrollHeight > element.clientHeight) {
+            return element;
+        }
+        element = element.parentElement;
+    }
+    return document.scrollingElement;
+}
+
+function finish() {
+    const keys = Array.from(details.keys());
+    if (keys.every(key => /^[0-9]+$/.test(key))) {
+        keys.sort((a, b) => a - b);
+    }
+    callback(keys.map(key => details.get(key)));
+}
+
+const container = getScrollContainer();
+let idleSteps = 0;
+
+function step() {
+    const added = collect();
+    idleSteps = added ? 0 : idleSteps + 1;
+    const atBottom = container.scrollTop + container.clientHeight >= container.scrollHeight - 1;
+    if ((expectedCount && details.size >= expectedCount) || (atBottom && idleSteps > 2) ||
+        (!expectedCount && atBottom) || Date.now() > deadline) {
+        finish();
+        return;
+    }
+    container.scrollTop += Math.max(container.clientHeight * 0.8, 100);
+    container.dispatchEvent(new Event('scroll'));
+    setTimeout(step, 50);
+}
+
+step();
+'''
 
 
 class UserPage(Page):
@@ -17,9 +97,11 @@ class UserPage(Page):
         super(UserPage, self).__init__(driver, base_url)
         self.locator = UserPageLocators
         self.custom_timeout = 10
+        self.user_id_cache = UserIdCache() if config.USER_ID_CACHE_ENABLED else None
 
+    @traced()
     def wait_element_to_be_visible(self, *locator):
-        WebDriverWait(self.driver, timeout=self.custom_timeout).until(EC.visibility_of_element_located(locator))
+        self.wait_for_conditions([('visible', locator)], default_timeout=self.custom_timeout)
 
     def handle_session_expired(self):
         try:
@@ -30,30 +112,58 @@ class UserPage(Page):
             Screenshot.take_screenshot(self.driver, 'no_such_element')
             return False
 
-    def handle_redirect_homepage(self):
-        try:
-            super().wait_element_to_be_visible(*self.locator.home_title)
-            return True
-        except TimeoutException:
-            return False
-
-    def wait_title_to_be_visible(self, url, locator, max_retries=6):
-        for _ in range(max_retries):
+    def is_session_alive(self):
+        self.open_page()
+        for _ in range(2):
             try:
-                self.open_page(url)
-                self.wait_element_to_be_visible(*locator)
-                return
+                self.wait_element_to_be_visible(*HomePageLocators.msft_user_info_button)
+                return True
             except TimeoutException:
-                if self.handle_redirect_homepage():
-                    continue
-                if self.handle_session_expired():
-                    continue
+                if not (self.is_element_exists(*self.locator.session_expired_info) and self.handle_session_expired()):
+                    return False
+        return False
+
+    def handle_redirect_homepage(self, url):
+        return unquote(url).lstrip('#') not in unquote(self.get_url())
 
-    def wait_component(self, component, max_retries=3):
-        for _ in range(max_retries):
+    @traced()
+    def wait_title_to_be_visible(self, url, locator):
+        outcomes = {
+            'title': ('visible', locator),
+            'home': ('visible', self.locator.home_title),
+            'session_expired': ('visible', self.locator.session_expired_info)
+        }
+        for attempt in retry_attempts('wait_title_to_be_visible'):
+            with tracer.span('UserPage.wait_title_to_be_visible.attempt', attempt=attempt):
+                self.open_page(url, force_reload=attempt > 0)
+                outcome = self.wait_for_any(outcomes, default_timeout=self.custom_timeout)
+                if outcome == 'home' and not self.handle_redirect_homepage(url):
+                    outcome = self.wait_for_any({'title': outcomes['title']}, default_timeout=self.custom_timeout)
+            if outcome == 'title':
+                circuit_breaker.record_success()
+                tracer.record_browser_timing(self.driver, url)
+                return True
+            circuit_breaker.record_failure(outcome or 'timeout')
+            if outcome == 'session_expired':
+                self.handle_session_expired()
+        return False
+
+    @traced()
+    def wait_component(self, component):
+        for _ in retry_attempts('wait_component'):
             try:
-                self.wait_title_to_be_visible(url=component['url'], locator=component['title'])
-                self.wait_frame_to_be_visible(*component['frame'])
+                if not self.wait_title_to_be_visible(url=component['url'], locator=component['title']):
+                    continue
+                outcome = self.wait_for_any({
+                    'frame': ('frame', component['frame']),
+                    'session_expired': ('visible', self.locator.session_expired_info)
+                })
+                if outcome != 'frame':
+                    circuit_breaker.record_failure(outcome or 'timeout')
+                    if outcome == 'session_expired':
+                        self.handle_session_expired()
+                    continue
+                tracer.record_browser_timing(self.driver, component['url'])
                 if 'element' in component:
                     super().wait_element_to_be_visible(*component['element'])
                     return self.find_element(*component['element'])
@@ -76,45 +186,50 @@ class UserPage(Page):
             'loading': self.locator.device_found_loading_bar
         }
         self.wait_component(component)
-        if self.is_found(self.locator.devices_found_info, '0 devices found'):
+        is_found = self.is_found(self.locator.devices_found_info, '0 devices found')
+        if is_found is None:
+            return None
+        if is_found:
             super().wait_element_to_be_visible(*self.locator.device_row)
-            elements = self.driver.find_elements(*self.locator.device_row)
-            for element in elements:
-                html_code = element.get_attribute('outerHTML')
-                device_detail = self.get_device_detail(html_code)
-                device_info.append(device_detail)
+            device_info = self.get_device_details(self.get_found_count(self.locator.devices_found_info))
         if device_info:
             for device in device_info:
                 device['Email'] = email
         return device_info
 
     def is_found(self, locator, not_found_info):
-        try:
-            self.wait_element_text_to_be_changed(locator, not_found_info)
-            return True
-        except TimeoutException:
-            try:
-                super().wait_element_to_be_visible(*self.locator.no_results_info)
-                return False
-            except NoSuchElementException as exception:
-                Screenshot.take_screenshot(self.driver, 'no_such_element')
-
-    def element_text_changed(self, locator, expected_text):
-        element = self.find_element(*locator)
-        current_text = element.text.strip()
-        return current_text and current_text != expected_text
+        outcome = self.wait_for_any({
+            'results': ('text_changed', locator, not_found_info),
+            'no_results': ('visible', self.locator.no_results_info)
+        }, default_timeout=self.custom_timeout)
+        if outcome is None:
+            Screenshot.take_screenshot(self.driver, 'no_such_element')
+            return None
+        return outcome == 'results'
 
+    @traced()
     def wait_element_text_to_be_changed(self, locator, expected_text):
         super().wait_element_to_be_visible(*locator)
-        WebDriverWait(self.driver, timeout=self.custom_timeout).until(
-            lambda x: self.element_text_changed(locator, expected_text))
+        self.wait_for_conditions([('text_changed', locator, expected_text)], default_timeout=self.custom_timeout)
 
     @_step
     @allure.step('Get user id')
-    def get_user_id(self, email, max_retries=2):
-        for _ in range(max_retries):
+    def get_user_id(self, email):
+        if self.user_id_cache is not None:
+            is_cached, user_id = self.user_id_cache.get(email)
+            if is_cached:
+                return user_id if user_id else USER_NOT_FOUND
+        for _ in retry_attempts('get_user_id'):
             user_id = self.extract_user_id(email)
-            if user_id is None or email == self.extract_email(user_id):
+            if user_id is None:
+                continue
+            if user_id == USER_NOT_FOUND:
+                if self.user_id_cache is not None:
+                    self.user_id_cache.set(email, None)
+                return USER_NOT_FOUND
+            if email == self.extract_email(user_id):
+                if self.user_id_cache is not None:
+                    self.user_id_cache.set(email, user_id)
                 return user_id
         return None
 
@@ -122,7 +237,10 @@ class UserPage(Page):
     @allure.step('Extract user id')
     def extract_user_id(self, email):
         self.search_user(email)
-        if self.is_found(self.locator.users_found_info, '0 users found'):
+        is_found = self.is_found(self.locator.users_found_info, '0 users found')
+        if is_found is False:
+            return USER_NOT_FOUND
+        if is_found:
             super().wait_element_to_be_visible(*self.locator.user_link)
             link = self.find_element(*self.locator.user_link).get_attribute('href')
             user_id_pattern = re.compile(r'userId/([0-9a-fA-F-]+)')
@@ -130,8 +248,7 @@ class UserPage(Page):
             if match:
                 user_id = match.group(1)
                 return user_id
-        else:
-            return None
+        return None
 
     @_step
     @allure.step('Search user')
@@ -146,6 +263,35 @@ class UserPage(Page):
         }
         self.wait_component(component)
 
+    def get_found_count(self, locator):
+        match = re.search(r'\d[\d,]*', self.find_element(*locator).text)
+        if match:
+            return int(match.group().replace(',', ''))
+        return None
+
+    def get_device_details(self, expected_count=None):
+        try:
+            self.set_script_timeout(self.custom_timeout + 5)
+            device_details = self.driver.execute_async_script(
+                HARVEST_DEVICE_DETAILS_SCRIPT, expected_count, self.custom_timeout * 1000)
+            if device_details:
+                self.check_device_count(device_details, expected_count)
+                return device_details
+            Logger().warning('* Device harvest returned no rows, reading the rendered rows instead')
+        except WebDriverException as exception:
+            Logger().warning(f'* Device harvest failed, reading the rendered rows instead: {exception.msg}')
+        device_details = []
+        for element in self.driver.find_elements(*self.locator.device_row):
+            html_code = element.get_attribute('outerHTML')
+            device_details.append(self.get_device_detail(html_code))
+        self.check_device_count(device_details, expected_count)
+        return device_details
+
+    @staticmethod
+    def check_device_count(device_details, expected_count):
+        if expected_count and len(device_details) < expected_count:
+            Logger().warning(f'* Only {len(device_details)} of {expected_count} devices harvested')
+
     def get_device_detail(self, html):
         soup = BeautifulSoup(html, 'html.parser')
         details_cells = soup.find_all('div', class_='ms-DetailsRow-cell')
@@ -165,4 +311,26 @@ class UserPage(Page):
             'frame': self.locator.user_profile,
             'element': self.locator.user_email
         }
-        return self.wait_component(component).text.lower().strip()
+        element = self.wait_component(component)
+        if element is None:
+            return None
+        return element.text.lower().strip()
+
+    @_step
+    @allure.step('Download device list')
+    def download_device_list(self):
+        download_dir = config.BROWSER_DOWNLOAD_DIR_PATH
+        for file_path in download_dir.glob('*.csv'):
+            file_path.unlink()
+        component = {
+            'url': '#view/Microsoft_AAD_Devices/DevicesMenuBlade/~/Devices/menuId/Devices',
+            'title': self.locator.all_devices_title,
+            'frame': self.locator.devices_list,
+            'loading': self.locator.device_found_loading_bar
+        }
+        self.wait_component(component)
+        self.click(*self.locator.download_devices_button)
+        self.driver.switch_to.default_content()
+        self.click(*self.locator.start_download_button)
+        self.wait_for_download_completion(download_dir, '.csv')
+        return max(download_dir.glob('*.csv'), key=os.path.getmtime)
@@ -0,0 +1,296 @@
+import http.client
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+
+from selenium.common.exceptions import WebDriverException
+
+from utils import crawler
+from utils.config import config
+from utils.logger import Logger
+from utils.metrics import metrics
+from utils.random_generator import random_browser
+from utils.run_journal import RunJournal
+from utils.session_store import SessionStore
+from utils.tracer import tracer
+from utils.utils import get_base_url_by_job_name
+from utils.work_queue import WorkQueue
+
+REFILL_DELAY_SECONDS = 5
+
+
+class PooledBrowser(object):
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.driver = crawler.start_driver()
+        self.started_at = time.monotonic()
+        self.user_page = None
+        self.logged_in_at = None
+        self.jobs = 0
+        self.login()
+
+    def login(self, reuse_session=config.BROWSER_SESSION_REUSE):
+        self.user_page = crawler.login(self.driver, self.base_url, reuse_session=reuse_session)
+        self.logged_in_at = time.monotonic()
+
+    def relogin(self):
+        SessionStore('mem').reset(self.driver)
+        self.login(reuse_session=False)
+
+    def is_expired(self):
+        return time.monotonic() - self.started_at >= config.DAEMON_BROWSER_MAX_AGE or \
+            self.jobs >= config.DAEMON_BROWSER_MAX_JOBS
+
+    def check_health(self):
+        if time.monotonic() - self.logged_in_at >= config.DAEMON_RELOGIN_INTERVAL:
+            Logger().info('Proactively logging in again before the portal session expires')
+            self.relogin()
+        elif not self.user_page.is_session_alive():
+            Logger().info('Pooled browser session is dead, logging in again')
+            self.relogin()
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except WebDriverException:
+            pass
+
+
+class BrowserPool(object):
+    def __init__(self, base_url, size=config.DAEMON_POOL_SIZE):
+        self.base_url = base_url
+        self.size = size
+        self.idle = queue.Queue()
+        self.stopped = threading.Event()
+        self.lock = threading.Lock()
+        self.missing = 0
+        self.refill_delay = REFILL_DELAY_SECONDS
+
+    def start(self):
+        for _ in range(self.size):
+            self.replace()
+        threading.Thread(target=self.maintain, name='browser-pool-maintainer', daemon=True).start()
+
+    def create(self):
+        start = time.perf_counter_ns()
+        browser = PooledBrowser(self.base_url)
+        metrics.observe('daemon.browser_create', time.perf_counter_ns() - start)
+        return browser
+
+    def replace(self):
+        try:
+            browser = self.create()
+        except Exception as exception:
+            metrics.increment('daemon_browser_create_failed')
+            Logger().error(f'* Failed to start a pooled browser, retrying later: {exception}')
+            with self.lock:
+                self.missing += 1
+            return False
+        self.idle.put(browser)
+        return True
+
+    def recycle(self, browser):
+        Logger().info(f'Recycling pooled browser after {browser.jobs} job(s)')
+        metrics.increment('daemon_browser_recycled')
+        browser.quit()
+        self.replace()
+
+    def refill(self):
+        with self.lock:
+            missing, self.missing = self.missing, 0
+        for _ in range(missing):
+            self.replace()
+        with self.lock:
+            if self.missing:
+                self.refill_delay = min(self.refill_delay * 2, config.DAEMON_HEALTH_CHECK_INTERVAL)
+            else:
+                self.refill_delay = REFILL_DELAY_SECONDS
+
+    def acquire(self, timeout=config.DAEMON_REQUEST_TIMEOUT):
+        return self.idle.get(timeout=timeout)
+
+    def release(self, browser, is_broken=False):
+        if is_broken or browser.is_expired():
+            self.recycle(browser)
+        else:
+            self.idle.put(browser)
+
+    def maintain(self):
+        next_health_check = time.monotonic() + config.DAEMON_HEALTH_CHECK_INTERVAL
+        while True:
+            with self.lock:
+                delay = self.refill_delay if self.missing else next_health_check - time.monotonic()
+            if self.stopped.wait(max(delay, 0)):
+                return
+            try:
+                self.refill()
+                if time.monotonic() >= next_health_check:
+                    next_health_check = time.monotonic() + config.DAEMON_HEALTH_CHECK_INTERVAL
+                    self.check_idle_browsers()
+            except Exception as exception:
+                Logger().error(f'* Browser pool maintenance failed: {exception}')
+
+    def check_idle_browsers(self):
+        for _ in range(self.idle.qsize()):
+            try:
+                browser = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                if browser.is_expired():
+                    self.recycle(browser)
+                    continue
+                browser.check_health()
+            except Exception as exception:
+                Logger().error(f'* Pooled browser health check failed: {exception}')
+                self.recycle(browser)
+                continue
+            self.idle.put(browser)
+
+    def close(self):
+        self.stopped.set()
+        while not self.idle.empty():
+            self.idle.get_nowait().quit()
+
+    def collect_device_list(self, work_queue, journal):
+        work_queue.reset_claimed()
+        worker_count = max(1, min(self.size, work_queue.count('pending')))
+        with ThreadPoolExecutor(max_workers=worker_count) as executor:
+            futures = [executor.submit(self.collect_from_queue, work_queue, journal, f'pool-{index}')
+                       for index in range(worker_count)]
+            for future in futures:
+                future.result()
+        return journal.get_device_list(work_queue)
+
+    def collect_from_queue(self, work_queue, journal, worker):
+        browser = self.acquire()
+        is_broken = False
+        try:
+            crawler.collect_device_list(browser.user_page, work_queue, journal, worker)
+        except Exception:
+            is_broken = True
+            raise
+        finally:
+            browser.jobs += 1
+            self.release(browser, is_broken=is_broken)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    pool = None
+
+    def do_GET(self):
+        if self.path != '/health':
+            return self.send_json(404, {'error': f'Unknown path {self.path}'})
+        self.send_json(200, {'status': 'ok', 'browsers': self.pool.size, 'idle': self.pool.idle.qsize(),
+                             'missing': self.pool.missing})
+
+    def do_POST(self):
+        if self.path != '/crawl':
+            return self.send_json(404, {'error': f'Unknown path {self.path}'})
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        start = time.perf_counter_ns()
+        try:
+            journal = RunJournal(request['journal_path'])
+            device_list = self.pool.collect_device_list(WorkQueue(request['email_queue_path']), journal)
+        except Exception as exception:
+            Logger().error(f'* Crawl request failed: {exception}')
+            return self.send_json(500, {'error': str(exception)})
+        finally:
+            metrics.observe('daemon.crawl', time.perf_counter_ns() - start)
+            metrics.dump()
+            metrics.reset()
+            if tracer.enabled:
+                Logger().info(f'Trace written to {tracer.dump()}')
+                tracer.reset()
+        self.send_json(200, {'device_list': device_list})
+
+    def send_json(self, status, body):
+        content = json.dumps(body).encode('UTF-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        Logger().debug(format % args)
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(str(self.socket_path))
+
+
+def request_daemon(method, path, body=None, timeout=None):
+    connection = UnixHTTPConnection(config.DAEMON_SOCKET_FILE_PATH, timeout=timeout)
+    try:
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def is_daemon_available():
+    if not os.path.exists(config.DAEMON_SOCKET_FILE_PATH):
+        return False
+    try:
+        status, _ = request_daemon('GET', '/health', timeout=2)
+    except (OSError, ValueError, http.client.HTTPException):
+        return False
+    return status == 200
+
+
+def submit_to_daemon(email_queue_path=config.EMAIL_QUEUE_FILE_PATH, journal_path=config.DEVICE_LIST_JOURNAL_FILE_PATH):
+    status, body = request_daemon('POST', '/crawl',
+                                  {'email_queue_path': str(email_queue_path), 'journal_path': str(journal_path)},
+                                  timeout=config.DAEMON_REQUEST_TIMEOUT)
+    if status != 200:
+        error_info = f'Browser daemon failed to crawl: {body.get("error")}'
+        Logger().error(error_info)
+        raise Exception(error_info)
+    return body['device_list']
+
+
+def main():
+    if not os.environ.get('BROWSER'):
+        random_browser()
+    base_url = get_base_url_by_job_name(config.JOB_LIST, 'test_download_mem_report')
+    pool = BrowserPool(base_url)
+    pool.start()
+    socket_path = config.DAEMON_SOCKET_FILE_PATH
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    DaemonRequestHandler.pool = pool
+    server = UnixHTTPServer(str(socket_path), DaemonRequestHandler)
+    os.chmod(socket_path, 0o600)
+    Logger().info(f'Browser daemon serving {pool.size} browser(s) on {socket_path}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(socket_path)
+        pool.close()
+
+
+if __name__ == '__main__':
+    main()
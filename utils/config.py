@@ -2,6 +2,7 @@ import datetime
 import json
 import os
 import sys
+from functools import cached_property
 from pathlib import Path
 
 from decouple import config as decouple_config
@@ -16,45 +17,189 @@ def set_columns_as_str(columns, dtype=str):
     return dtype_dict
 
 
+def make_dirs(path):
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
 class Config(object):
     allure_results_dir = decouple_config('ALLURE_RESULTS_DIR', default='allure-results', cast=lambda x: x.split(','))
     logs_dir = decouple_config('LOGS_DIR', default='logs', cast=lambda x: x.split(','))
     screenshots_dir = decouple_config('SCREENSHOTS_DIR', default='screenshots', cast=lambda x: x.split(','))
     browser_download_dir = decouple_config('BROWSER_DOWNLOAD_DIR', default='download', cast=lambda x: x.split(','))
     export_report_dir = decouple_config('EXPORT_REPORT_DIR', default='export', cast=lambda x: x.split(','))
+    browser_sessions_dir = decouple_config('BROWSER_SESSIONS_DIR', default='sessions', cast=lambda x: x.split(','))
+    metrics_dir = decouple_config('METRICS_DIR', default='metrics', cast=lambda x: x.split(','))
+    drivers_dir = decouple_config('DRIVERS_DIR', default='drivers', cast=lambda x: x.split(','))
     root_path = Path('/', 'tmp', 'find-info')
 
-    ALLURE_RESULTS_DIR_PATH = Path(root_path, *allure_results_dir).resolve()
-    logs_dir_path = Path(root_path, *logs_dir).resolve()
-    SCREENSHOTS_DIR_PATH = Path(root_path, *screenshots_dir).resolve()
-    BROWSER_DOWNLOAD_DIR_PATH = Path(root_path, *browser_download_dir).resolve()
-    export_report_dir_path = Path(root_path, *export_report_dir).resolve()
-    for path in [ALLURE_RESULTS_DIR_PATH, logs_dir_path, SCREENSHOTS_DIR_PATH, BROWSER_DOWNLOAD_DIR_PATH,
-                 export_report_dir_path]:
-        if not os.path.exists(path):
-            os.makedirs(path)
-
-    LOG_FILE_PATH = Path(logs_dir_path, decouple_config('LOG_FILE', default='steps.log'))
+    @cached_property
+    def ALLURE_RESULTS_DIR_PATH(self):
+        return make_dirs(Path(self.root_path, *self.allure_results_dir).resolve())
+
+    @cached_property
+    def logs_dir_path(self):
+        return make_dirs(Path(self.root_path, *self.logs_dir).resolve())
+
+    @cached_property
+    def SCREENSHOTS_DIR_PATH(self):
+        return make_dirs(Path(self.root_path, *self.screenshots_dir).resolve())
+
+    @cached_property
+    def BROWSER_DOWNLOAD_DIR_PATH(self):
+        return make_dirs(Path(self.root_path, *self.browser_download_dir).resolve())
+
+    @cached_property
+    def export_report_dir_path(self):
+        return make_dirs(Path(self.root_path, *self.export_report_dir).resolve())
+
+    @cached_property
+    def BROWSER_SESSIONS_DIR_PATH(self):
+        return make_dirs(Path(self.root_path, *self.browser_sessions_dir).resolve())
+
+    @cached_property
+    def METRICS_DIR_PATH(self):
+        return make_dirs(Path(self.root_path, *self.metrics_dir).resolve())
+
+    @cached_property
+    def DRIVERS_DIR_PATH(self):
+        return make_dirs(Path(self.root_path, *self.drivers_dir).resolve())
+
+    @cached_property
+    def LOG_FILE_PATH(self):
+        return Path(self.logs_dir_path, decouple_config('LOG_FILE', default='steps.log'))
+
+    @cached_property
+    def METRICS_PROMETHEUS_FILE_PATH(self):
+        return Path(self.METRICS_DIR_PATH, decouple_config('METRICS_PROMETHEUS_FILE', default='export_data.prom'))
+
+    @cached_property
+    def JOB_LIST(self):
+        return decouple_config('JOB_LIST', default=[], cast=json.loads)
+
+    LOG_QUEUE_ENABLED = decouple_config('LOG_QUEUE_ENABLED', default=True, cast=bool)
+    TRACE_ENABLED = decouple_config('TRACE_ENABLED', default=False, cast=bool)
     PYTHON_VERSION = f'{sys.version_info.major}.{sys.version_info.minor}'
-    JOB_LIST = decouple_config('JOB_LIST', default=[], cast=json.loads)
     JOB_RERUNS = decouple_config('JOB_RERUNS', default=0, cast=int)
     JOB_RERUNS_DELAY = decouple_config('JOB_RERUNS_DELAY', default=0, cast=int)
+    JOB_WORKERS = decouple_config('JOB_WORKERS', default=1, cast=int)
+    JOB_CONCURRENCY_MODE = decouple_config('JOB_CONCURRENCY_MODE', default='browser')
+    SCHEDULER_TIMEZONE = decouple_config('SCHEDULER_TIMEZONE', default=None, cast=lambda x: x or None)
+    SCHEDULER_MAX_WORKERS = decouple_config('SCHEDULER_MAX_WORKERS', default=2, cast=int)
+    SCHEDULER_MISFIRE_GRACE_TIME = decouple_config('SCHEDULER_MISFIRE_GRACE_TIME', default=600, cast=int)
+    DAEMON_ENABLED = decouple_config('DAEMON_ENABLED', default=True, cast=bool)
+    DAEMON_SOCKET_FILE_PATH = Path(root_path, decouple_config('DAEMON_SOCKET_FILE', default='browser_daemon.sock'))
+    DAEMON_POOL_SIZE = decouple_config('DAEMON_POOL_SIZE', default=1, cast=int)
+    DAEMON_HEALTH_CHECK_INTERVAL = decouple_config('DAEMON_HEALTH_CHECK_INTERVAL', default=300, cast=float)
+    DAEMON_RELOGIN_INTERVAL = decouple_config('DAEMON_RELOGIN_INTERVAL', default=3600, cast=float)
+    DAEMON_BROWSER_MAX_AGE = decouple_config('DAEMON_BROWSER_MAX_AGE', default=14400, cast=float)
+    DAEMON_BROWSER_MAX_JOBS = decouple_config('DAEMON_BROWSER_MAX_JOBS', default=50, cast=int)
+    DAEMON_REQUEST_TIMEOUT = decouple_config('DAEMON_REQUEST_TIMEOUT', default=21600, cast=float)
+    RETRY_EMAIL_TIME_BUDGET = decouple_config('RETRY_EMAIL_TIME_BUDGET', default=300, cast=float)
+    CIRCUIT_BREAKER_THRESHOLD = decouple_config('CIRCUIT_BREAKER_THRESHOLD', default=5, cast=int)
+    CIRCUIT_BREAKER_COOLDOWN = decouple_config('CIRCUIT_BREAKER_COOLDOWN', default=120, cast=float)
     BROWSER_LIST = decouple_config('BROWSER_LIST', default='chrome', cast=lambda x: x.split(','))
     BROWSER_HEADLESS_MODE = decouple_config('BROWSER_HEADLESS_MODE', default=True, cast=bool)
     BROWSER_TIMEOUT = decouple_config('BROWSER_TIMEOUT', default=140, cast=int)
+    SCREENSHOT_DEDUPLICATION_SECONDS = decouple_config('SCREENSHOT_DEDUPLICATION_SECONDS', default=60, cast=float)
+    SCREENSHOT_BURST_SECONDS = decouple_config('SCREENSHOT_BURST_SECONDS', default=60, cast=float)
+    SCREENSHOT_BURST_LIMIT = decouple_config('SCREENSHOT_BURST_LIMIT', default=5, cast=int)
+    WAIT_ENGINE = decouple_config('WAIT_ENGINE', default='observer')
+    NAVIGATION_MODE = decouple_config('NAVIGATION_MODE', default='hash')
+    ADAPTIVE_TIMEOUT_ENABLED = decouple_config('ADAPTIVE_TIMEOUT_ENABLED', default=True, cast=bool)
+    ADAPTIVE_TIMEOUT_PERCENTILE = decouple_config('ADAPTIVE_TIMEOUT_PERCENTILE', default=0.99, cast=float)
+    ADAPTIVE_TIMEOUT_MULTIPLIER = decouple_config('ADAPTIVE_TIMEOUT_MULTIPLIER', default=2, cast=float)
+    ADAPTIVE_TIMEOUT_FLOOR = decouple_config('ADAPTIVE_TIMEOUT_FLOOR', default=5, cast=float)
+    ADAPTIVE_TIMEOUT_CEILING = decouple_config('ADAPTIVE_TIMEOUT_CEILING', default=BROWSER_TIMEOUT, cast=float)
+    ADAPTIVE_TIMEOUT_MIN_SAMPLES = decouple_config('ADAPTIVE_TIMEOUT_MIN_SAMPLES', default=20, cast=int)
+    ADAPTIVE_TIMEOUT_MAX_SAMPLES = decouple_config('ADAPTIVE_TIMEOUT_MAX_SAMPLES', default=500, cast=int)
+    ADAPTIVE_TIMEOUT_MAX_TIMEOUT_RATIO = decouple_config('ADAPTIVE_TIMEOUT_MAX_TIMEOUT_RATIO', default=0.05,
+                                                        cast=float)
+    BROWSER_SESSION_REUSE = decouple_config('BROWSER_SESSION_REUSE', default=True, cast=bool)
+    WEBDRIVER_OFFLINE = decouple_config('WEBDRIVER_OFFLINE', default=False, cast=bool)
+    BROWSER_LEAN_PROFILE = decouple_config('BROWSER_LEAN_PROFILE', default=False, cast=bool)
+    BROWSER_BLOCKED_URL_PATTERNS = decouple_config(
+        'BROWSER_BLOCKED_URL_PATTERNS',
+        default='*.png,*.jpg,*.jpeg,*.gif,*.webp,*.ico,*.woff,*.woff2,*.ttf,*.otf,*.eot,*.mp4,*.webm,*.mp3,*.ogg',
+        cast=lambda x: [pattern for pattern in x.split(',') if pattern])
+    BROWSER_BLOCKED_HOSTS = decouple_config(
+        'BROWSER_BLOCKED_HOSTS',
+        default='browser.events.data.microsoft.com,js.monitor.azure.com,dc.services.visualstudio.com,'
+                'eastus-8.in.applicationinsights.azure.com,browser.pipe.aria.microsoft.com',
+        cast=lambda x: [host for host in x.split(',') if host])
     SLEEP_TIME_UPPER_LIMIT_RANGE = decouple_config('SLEEP_TIME_UPPER_LIMIT_RANGE', default='60,120',
                                                    cast=lambda x: tuple(int(val) for val in x.split(',')))
-    USERS = decouple_config('USERS', cast=lambda x: json.loads(x))
 
     CST_NOW = datetime.datetime.now(tz=datetime.timezone(datetime.timedelta(hours=8)))
     CST_NOW_STR = CST_NOW.strftime('%Y%m%d')
 
     EMAIL_LIST_FILE_PATH = Path(root_path,
                                 decouple_config('EMAIL_LIST_FILE_NAME', default=f'email_list.xlsx'))
-    DEVICE_COLUMN_MAPPING = decouple_config('COLUMN_NAMES_MAPPING', default='{}', cast=json.loads)
-    DEVICE_OS_TO_EXCLUDE = decouple_config('OS_TO_EXCLUDE', default='[]', cast=json.loads)
-    DEVICE_LIST_FILE_PATH = Path(export_report_dir_path,
-                                 decouple_config('DEVICE_LIST_FILE_NAME', default=f'device_list_{CST_NOW_STR}.xlsx'))
+    LOCATOR_LATENCY_FILE_PATH = Path(root_path,
+                                     decouple_config('LOCATOR_LATENCY_FILE_NAME', default='locator_latency.json'))
+    USER_ID_CACHE_ENABLED = decouple_config('USER_ID_CACHE_ENABLED', default=True, cast=bool)
+    USER_ID_CACHE_FILE_PATH = Path(root_path, decouple_config('USER_ID_CACHE_FILE_NAME', default='user_id_cache.sqlite'))
+    USER_ID_CACHE_TTL_HOURS = decouple_config('USER_ID_CACHE_TTL_HOURS', default=168, cast=float)
+    USER_ID_CACHE_NEGATIVE_TTL_HOURS = decouple_config('USER_ID_CACHE_NEGATIVE_TTL_HOURS', default=24, cast=float)
+    DEVICE_COLLECTION_MODE = decouple_config('DEVICE_COLLECTION_MODE', default='per_user')
+    BULK_DEVICE_OWNER_COLUMN = decouple_config('BULK_DEVICE_OWNER_COLUMN', default='registeredOwners')
+
+    @cached_property
+    def RETRY_POLICIES(self):
+        return decouple_config(
+            'RETRY_POLICIES',
+            default='{"get_user_id": {"attempts": 2}, '
+                    '"wait_component": {"attempts": 3, "base_delay": 1, "max_delay": 10}, '
+                    '"wait_title_to_be_visible": {"attempts": 6, "base_delay": 0.5, "max_delay": 10}}',
+            cast=json.loads)
+
+    @cached_property
+    def DRIVER_MANIFEST_FILE_PATH(self):
+        return Path(self.DRIVERS_DIR_PATH, decouple_config('DRIVER_MANIFEST_FILE', default='manifest.json'))
+
+    @cached_property
+    def WEBDRIVER_PATHS(self):
+        return decouple_config('WEBDRIVER_PATHS', default='{}', cast=json.loads)
+
+    @cached_property
+    def WEBDRIVER_VERSIONS(self):
+        return decouple_config('WEBDRIVER_VERSIONS', default='{}', cast=json.loads)
+
+    @cached_property
+    def USERS(self):
+        return decouple_config('USERS', cast=lambda x: json.loads(x))
+
+    @cached_property
+    def DEVICE_COLUMN_MAPPING(self):
+        return decouple_config('COLUMN_NAMES_MAPPING', default='{}', cast=json.loads)
+
+    @cached_property
+    def DEVICE_OS_TO_EXCLUDE(self):
+        return decouple_config('OS_TO_EXCLUDE', default='[]', cast=json.loads)
+
+    @cached_property
+    def BULK_DEVICE_COLUMN_MAPPING(self):
+        return decouple_config(
+            'BULK_DEVICE_COLUMN_MAPPING',
+            default='{"displayName": "displayName", "accountEnabled": "accountEnabled", '
+                    '"operatingSystem": "operatingSystem", "operatingSystemVersion": "operatingSystemVersion", '
+                    '"joinType (trustType)": "trustType", "mdmDisplayName": "mdm", "isCompliant": "isCompliant", '
+                    '"registrationTime": "registrationDateTime", '
+                    '"approximateLastSignInDateTime": "approximateLastSignInDateTime"}',
+            cast=json.loads)
+
+    @cached_property
+    def DEVICE_LIST_FILE_PATH(self):
+        return Path(self.export_report_dir_path,
+                    decouple_config('DEVICE_LIST_FILE_NAME', default=f'device_list_{self.CST_NOW_STR}.xlsx'))
+
+    @cached_property
+    def DEVICE_LIST_JOURNAL_FILE_PATH(self):
+        return Path(self.export_report_dir_path, f'device_list_{self.CST_NOW_STR}.jsonl')
+
+    @cached_property
+    def EMAIL_QUEUE_FILE_PATH(self):
+        return self.DEVICE_LIST_FILE_PATH.with_name(f'{self.DEVICE_LIST_FILE_PATH.stem}_queue.sqlite')
 
 
 config = Config()
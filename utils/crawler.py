@@ -0,0 +1,166 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from selenium.common.exceptions import WebDriverException
+
+from pages.locators import LoginPageLocators, HomePageLocators
+from pages.login_page import LoginPage
+from pages.user_page import UserPage
+from utils.config import config
+from utils.driver_factory import DriverFactory
+from utils.excel_file import ExcelFile
+from utils.logger import Logger
+from utils.metrics import metrics
+from utils.retry import time_budget, circuit_breaker
+from utils.session_store import SessionStore
+from utils.tracer import tracer
+
+
+def generate_report(device_list):
+    df = pd.DataFrame(device_list)
+    column_mapping = config.DEVICE_COLUMN_MAPPING
+    df.rename(columns=column_mapping, inplace=True)
+    email_column = df.pop('Email')
+    df.insert(0, 'Email', email_column)
+
+    os_to_exclude = config.DEVICE_OS_TO_EXCLUDE
+    df_filtered = df[~df['OS'].isin(os_to_exclude)]
+
+    report_path = config.DEVICE_LIST_FILE_PATH
+    with ExcelFile(report_path.name, report_path, constant_memory=True) as excel:
+        excel.export_dataframe_to_excel(df_filtered, 'device_list', set_width_by_value=True)
+
+
+def start_driver():
+    driver = DriverFactory.get_driver(os.environ.get('BROWSER'), config.BROWSER_HEADLESS_MODE)
+    driver.implicitly_wait(0)
+    return driver
+
+
+def login(driver, base_url, reuse_session=config.BROWSER_SESSION_REUSE):
+    user_page = UserPage(driver, base_url)
+    session_store = SessionStore('mem')
+    if reuse_session and DriverFactory.restore_session(driver, 'mem', base_url):
+        if user_page.is_session_alive():
+            session_store.save(driver)
+            return user_page
+        Logger().info(msg='Restored session is dead, logging in again')
+        session_store.reset(driver)
+    user_page.open_page(wait_element=LoginPageLocators.msft_logo_img)
+    login_page = LoginPage(driver, base_url)
+    login_page.login(user='mem', wait_element=HomePageLocators.msft_user_info_button)
+    if config.BROWSER_SESSION_REUSE:
+        session_store.save(driver)
+    return user_page
+
+
+def collect_device_list(user_page, work_queue, journal, worker='main'):
+    for email in work_queue.claim_iter(worker):
+        if journal.is_completed(email):
+            work_queue.complete(email)
+            continue
+        circuit_breaker.wait_if_open()
+        start = time.perf_counter_ns()
+        time_budget.start()
+        tracer.set_email(email)
+        device_info = []
+        user_id = user_page.get_user_id(email=email)
+        Logger().info(msg=f"Email: {email}, User ID: {user_id}")
+        if user_id:
+            device_info = user_page.get_device_info(email=email, user_id=user_id)
+        metrics.observe('email', time.perf_counter_ns() - start)
+        if user_id is None or device_info is None:
+            metrics.increment('email_undetermined')
+            Logger().warning(f'* Could not determine the devices of {email}, leaving it for the next run')
+            work_queue.release(email)
+            continue
+        journal.record(email, device_info)
+        work_queue.complete(email)
+
+
+def collect_device_list_in_new_browser(base_url, work_queue, journal, worker):
+    driver = start_driver()
+    try:
+        user_page = login(driver, base_url)
+        collect_device_list(user_page, work_queue, journal, worker)
+    finally:
+        driver.quit()
+
+
+def open_portal_in_tab(tab_driver, base_url):
+    user_page = UserPage(tab_driver, base_url)
+    if not user_page.is_session_alive():
+        error_info = 'Portal session is not available in the new window'
+        Logger().error(error_info)
+        raise Exception(error_info)
+    return user_page
+
+
+def collect_device_list_in_tab(user_page, work_queue, journal, worker):
+    try:
+        collect_device_list(user_page, work_queue, journal, worker)
+    except WebDriverException as exception:
+        Logger().error(f'* {worker} failed: {exception.msg}')
+        if not (user_page.is_element_exists(*user_page.locator.session_expired_info) and
+                user_page.handle_session_expired()):
+            raise
+        collect_device_list(user_page, work_queue, journal, worker)
+
+
+def collect_device_list_in_tabs(driver, base_url, work_queue, journal, worker_count):
+    browser = os.environ.get('BROWSER')
+    user_page = login(driver, base_url)
+    driver.execute_cdp_cmd('Emulation.setFocusEmulationEnabled', {'enabled': True})
+    tab_drivers = []
+    try:
+        for _ in range(worker_count - 1):
+            tab_drivers.append(DriverFactory.open_tab_driver(driver, browser))
+        user_pages = [user_page] + [open_portal_in_tab(tab_driver, base_url) for tab_driver in tab_drivers]
+        with ThreadPoolExecutor(max_workers=worker_count) as executor:
+            futures = [executor.submit(collect_device_list_in_tab, user_page, work_queue, journal, f'tab-{index}')
+                       for index, user_page in enumerate(user_pages)]
+            for index, future in enumerate(futures):
+                exception = future.exception()
+                if exception is not None:
+                    metrics.increment('tab_failed')
+                    Logger().error(f'* tab-{index} stopped, its claimed emails go back to the queue: {exception}')
+        work_queue.reset_claimed(include_retry=False)
+        collect_device_list(user_page, work_queue, journal)
+    finally:
+        for tab_driver in tab_drivers:
+            DriverFactory.close_tab_driver(tab_driver)
+
+
+def log_undetermined(work_queue):
+    undetermined_count = work_queue.count('retry')
+    if undetermined_count:
+        Logger().warning(f'* {undetermined_count} email(s) left in {work_queue.path} for the next run')
+
+
+def collect_device_list_in_parallel(driver, base_url, work_queue, journal):
+    work_queue.reset_claimed()
+    pending_count = work_queue.count('pending')
+    Logger().info(msg=f'{pending_count} of {work_queue.count()} email(s) pending in {work_queue.path}, '
+                      f'{len(journal.entries)} already recorded in {journal.path}')
+    if pending_count:
+        worker_count = max(1, min(config.JOB_WORKERS, pending_count))
+        if config.JOB_CONCURRENCY_MODE == 'tab':
+            if os.environ.get('BROWSER') in DriverFactory.DEBUGGER_CAPABILITIES:
+                Logger().info(msg=f'Crawling the email queue with {worker_count} tab(s) in one browser')
+                collect_device_list_in_tabs(driver, base_url, work_queue, journal, worker_count)
+                log_undetermined(work_queue)
+                return journal.get_device_list(work_queue)
+            Logger().info(msg='Tab concurrency needs Chrome or Edge, using parallel browsers instead')
+        Logger().info(msg=f'Crawling the email queue with {worker_count} parallel browser(s)')
+        user_page = login(driver, base_url)
+        with ThreadPoolExecutor(max_workers=worker_count) as executor:
+            futures = [executor.submit(collect_device_list_in_new_browser, base_url, work_queue, journal,
+                                       f'worker-{index}')
+                       for index in range(1, worker_count)]
+            collect_device_list(user_page, work_queue, journal)
+            for future in futures:
+                future.result()
+    log_undetermined(work_queue)
+    return journal.get_device_list(work_queue)
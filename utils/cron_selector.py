@@ -1,15 +1,20 @@
 import datetime
+from functools import lru_cache
 
-import pytz
 from apscheduler.triggers.cron import CronTrigger
 
+from utils.config import config
+
+
+@lru_cache(maxsize=None)
+def get_trigger(cron: str, timezone: str = config.SCHEDULER_TIMEZONE):
+    return CronTrigger.from_crontab(cron, timezone=timezone)
+
 
 def match(cron: str, current_time=None):
+    trigger = get_trigger(cron)
     if not current_time:
-        utc_now = datetime.datetime.utcnow().replace(second=0, microsecond=0)
-        china_tz = pytz.timezone('Asia/Shanghai')
-        current_time = utc_now.replace(tzinfo=pytz.utc).astimezone(china_tz)
-    trigger = CronTrigger.from_crontab(cron)
+        current_time = datetime.datetime.now(trigger.timezone).replace(second=0, microsecond=0)
     if trigger.get_next_fire_time(None, current_time) == current_time:
         return True
     else:
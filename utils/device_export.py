@@ -0,0 +1,16 @@
+import pandas as pd
+
+from utils.config import config
+
+
+def join_devices_to_emails(device_list_path, email_list, owner_column=config.BULK_DEVICE_OWNER_COLUMN,
+                           column_mapping=config.BULK_DEVICE_COLUMN_MAPPING):
+    df = pd.read_csv(device_list_path, dtype=str, usecols=lambda x: x in column_mapping or x == owner_column)
+    owners = df.pop(owner_column).fillna('').str.lower().str.split(r'[;,]')
+    df = df.assign(Email=owners).explode('Email')
+    df['Email'] = df['Email'].str.strip()
+    df.rename(columns=column_mapping, inplace=True)
+    emails = pd.DataFrame({'Email': pd.Series(email_list, dtype=str).drop_duplicates()})
+    df = emails.merge(df, on='Email', how='inner')
+    columns = [column for column in dict.fromkeys(column_mapping.values()) if column in df.columns]
+    return df[['Email', *columns]]
@@ -1,13 +1,36 @@
+import json
+import time
+from urllib.parse import quote
+
 from selenium import webdriver
+from selenium.common.exceptions import WebDriverException, SessionNotCreatedException
 from selenium.webdriver.chrome.service import Service as ChromiumService
 from selenium.webdriver.edge.service import Service as EdgeService
 from selenium.webdriver.firefox.service import Service as FirefoxService
-from webdriver_manager.chrome import ChromeDriverManager
-from webdriver_manager.firefox import GeckoDriverManager
-from webdriver_manager.microsoft import EdgeChromiumDriverManager
 
 from utils.config import config
+from utils.driver_resolver import driver_resolver
 from utils.logger import Logger
+from utils.metrics import metrics
+from utils.session_store import SessionStore
+
+LEAN_PROXY_AUTO_CONFIG_SCRIPT = '''
+function FindProxyForURL(url, host) {{
+    var blockedHosts = {blocked_hosts};
+    var blockedPatterns = {blocked_patterns};
+    for (var i = 0; i < blockedHosts.length; i++) {{
+        if (host === blockedHosts[i]) {{
+            return 'PROXY 127.0.0.1:9';
+        }}
+    }}
+    for (var j = 0; j < blockedPatterns.length; j++) {{
+        if (shExpMatch(url, blockedPatterns[j])) {{
+            return 'PROXY 127.0.0.1:9';
+        }}
+    }}
+    return 'DIRECT';
+}}
+'''
 
 
 class DriverFactory(object):
@@ -22,9 +45,50 @@ class DriverFactory(object):
         '-inprivate'
     ]
     COMMON_OPTIONS = [
-        '--window-size=1920,2280',
+        '--window-size=1920,1080',
         '--start-maximized'
     ]
+    LEAN_OPTIONS = [
+        '--disable-extensions',
+        '--disable-background-networking',
+        '--disable-component-update',
+        '--disable-default-apps',
+        '--disable-sync',
+        '--no-first-run',
+        '--mute-audio',
+        '--blink-settings=imagesEnabled=false',
+        '--disable-site-isolation-trials',
+        '--disable-features=Translate,OptimizationHints,MediaRouter,IsolateOrigins,site-per-process'
+    ]
+    LEAN_FIREFOX_PREFERENCES = {
+        'permissions.default.image': 2,
+        'gfx.downloadable_fonts.enabled': False,
+        'media.autoplay.default': 5,
+        'media.autoplay.blocking_policy': 2,
+        'media.preload.default': 0,
+        'media.preload.auto': 0,
+        'network.prefetch-next': False,
+        'network.dns.disablePrefetch': True,
+        'browser.safebrowsing.malware.enabled': False,
+        'browser.safebrowsing.phishing.enabled': False,
+        'datareporting.healthreport.uploadEnabled': False,
+        'datareporting.policy.dataSubmissionEnabled': False,
+        'toolkit.telemetry.enabled': False,
+        'extensions.update.enabled': False,
+        'app.update.auto': False,
+        'network.proxy.type': 2,
+        'network.proxy.autoconfig_url.include_path': True,
+        'network.proxy.allow_hijacking_localhost': True
+    }
+    TAB_OPTIONS = [
+        '--disable-background-timer-throttling',
+        '--disable-backgrounding-occluded-windows',
+        '--disable-renderer-backgrounding'
+    ]
+    DEBUGGER_CAPABILITIES = {
+        'chrome': 'goog:chromeOptions',
+        'edge': 'ms:edgeOptions'
+    }
     HEADLESS_OPTIONS = [
         '--headless',
         '--no-sandbox',
@@ -34,8 +98,18 @@ class DriverFactory(object):
         '--disable-dev-shm-usage'
     ]
 
+    DRIVERS = {
+        'chrome': (webdriver.Chrome, ChromiumService),
+        'firefox': (webdriver.Firefox, FirefoxService),
+        'edge': (webdriver.Edge, EdgeService)
+    }
+
     @staticmethod
     def get_driver(browser, headless_mode=False):
+        if browser not in DriverFactory.DRIVERS:
+            error_info = 'Provide valid driver name'
+            Logger().error(error_info)
+            raise Exception(error_info)
         options = None
         if browser == 'chrome':
             options = webdriver.ChromeOptions()
@@ -55,8 +129,13 @@ class DriverFactory(object):
             options.set_preference('browser.download.manager.showWhenStarting', False)
             options.set_preference('browser.download.dir', fr'{str(config.BROWSER_DOWNLOAD_DIR_PATH)}')
             options.set_preference('browser.helperApps.neverAsk.saveToDisk',
-                                   f'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;application/zip')
+                                   f'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;'
+                                   f'application/zip;text/csv')
             options.set_preference("browser.download.manager.showAlertOnComplete", False)
+            if config.BROWSER_LEAN_PROFILE:
+                for name, value in DriverFactory.LEAN_FIREFOX_PREFERENCES.items():
+                    options.set_preference(name, value)
+                options.set_preference('network.proxy.autoconfig_url', DriverFactory.get_lean_proxy_auto_config())
         elif browser == 'edge':
             options = webdriver.EdgeOptions()
             for option in DriverFactory.EDGE_OPTIONS:
@@ -69,20 +148,108 @@ class DriverFactory(object):
             options.add_experimental_option('prefs', prefs)
         for option in DriverFactory.COMMON_OPTIONS:
             options.add_argument(option)
+        if config.BROWSER_LEAN_PROFILE and browser in ['chrome', 'edge']:
+            for option in DriverFactory.LEAN_OPTIONS:
+                options.add_argument(option)
+        if config.JOB_CONCURRENCY_MODE == 'tab' and browser in DriverFactory.DEBUGGER_CAPABILITIES:
+            for option in DriverFactory.TAB_OPTIONS:
+                options.add_argument(option)
         if headless_mode:
             for option in DriverFactory.HEADLESS_OPTIONS:
                 options.add_argument(option)
 
-        driver = None
-        if browser == 'chrome':
-            driver = webdriver.Chrome(service=ChromiumService(ChromeDriverManager().install()), options=options)
-        elif browser == 'firefox':
-            driver = webdriver.Firefox(service=FirefoxService(GeckoDriverManager().install()), options=options)
-        elif browser == 'edge':
-            driver = webdriver.Edge(service=EdgeService(EdgeChromiumDriverManager().install()), options=options)
-
-        if driver is None:
-            error_info = 'Provide valid driver name'
-            Logger().error(error_info)
-            raise Exception(error_info)
+        try:
+            driver, resolve_duration, service, browser_duration = DriverFactory.start_driver(browser, options)
+        except SessionNotCreatedException as exception:
+            if config.WEBDRIVER_OFFLINE or config.WEBDRIVER_PATHS.get(browser):
+                raise
+            Logger().warning(f'* Cached {browser} driver could not start a session, resolving it again: '
+                             f'{exception.msg}')
+            driver_resolver.evict(browser)
+            driver, resolve_duration, service, browser_duration = DriverFactory.start_driver(browser, options)
+        driver_resolver.record_browser_version(browser, driver.capabilities.get('browserVersion'))
+        metrics.observe(f'driver_resolve.{browser}', resolve_duration)
+        metrics.observe(f'driver_start.{browser}', service.start_duration)
+        metrics.observe(f'browser_start.{browser}', browser_duration)
+        Logger().info(f'Started {browser}: driver resolve {round(resolve_duration / 1e6, 3)} ms, '
+                      f'driver start {round(service.start_duration / 1e6, 3)} ms, '
+                      f'browser start {round(browser_duration / 1e6, 3)} ms')
+        if config.BROWSER_LEAN_PROFILE:
+            DriverFactory.apply_lean_profile(driver)
         return driver
+
+    @staticmethod
+    def start_driver(browser, options):
+        start = time.perf_counter_ns()
+        driver_path = driver_resolver.resolve(browser)
+        resolve_duration = time.perf_counter_ns() - start
+        driver_class, service_class = DriverFactory.DRIVERS[browser]
+        service = DriverFactory.time_service_start(service_class(driver_path))
+        start = time.perf_counter_ns()
+        driver = driver_class(service=service, options=options)
+        browser_duration = time.perf_counter_ns() - start - service.start_duration
+        return driver, resolve_duration, service, browser_duration
+
+    @staticmethod
+    def open_tab_driver(driver, browser):
+        debugger_address = driver.capabilities[DriverFactory.DEBUGGER_CAPABILITIES[browser]]['debuggerAddress']
+        options = webdriver.ChromeOptions() if browser == 'chrome' else webdriver.EdgeOptions()
+        options.debugger_address = debugger_address
+        driver_class, service_class = DriverFactory.DRIVERS[browser]
+        tab_driver = driver_class(service=service_class(driver_resolver.resolve(browser)), options=options)
+        tab_driver.switch_to.new_window('window')
+        tab_driver.implicitly_wait(0)
+        tab_driver.execute_cdp_cmd('Emulation.setFocusEmulationEnabled', {'enabled': True})
+        if config.BROWSER_LEAN_PROFILE:
+            DriverFactory.apply_lean_profile(tab_driver)
+        return tab_driver
+
+    @staticmethod
+    def close_tab_driver(tab_driver):
+        try:
+            tab_driver.close()
+        except WebDriverException:
+            pass
+        try:
+            tab_driver.quit()
+        except WebDriverException:
+            pass
+
+    @staticmethod
+    def time_service_start(service):
+        start_service = service.start
+        service.start_duration = 0
+
+        def start():
+            start_time = time.perf_counter_ns()
+            try:
+                start_service()
+            finally:
+                service.start_duration = time.perf_counter_ns() - start_time
+
+        service.start = start
+        return service
+
+    @staticmethod
+    def apply_lean_profile(driver):
+        if not hasattr(driver, 'execute_cdp_cmd'):
+            return
+        blocked_urls = config.BROWSER_BLOCKED_URL_PATTERNS + [pattern for host in config.BROWSER_BLOCKED_HOSTS
+                                                              for pattern in [f'*://{host}/*', f'*://{host}:*']]
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked_urls})
+
+    @staticmethod
+    def get_lean_proxy_auto_config():
+        script = LEAN_PROXY_AUTO_CONFIG_SCRIPT.format(
+            blocked_hosts=json.dumps(config.BROWSER_BLOCKED_HOSTS),
+            blocked_patterns=json.dumps(config.BROWSER_BLOCKED_URL_PATTERNS))
+        return f'data:application/x-ns-proxy-autoconfig,{quote(script)}'
+
+    @staticmethod
+    def restore_session(driver, user, url):
+        try:
+            return SessionStore(user).restore(driver, url)
+        except WebDriverException as exception:
+            Logger().error(f'* Failed to restore browser session of user {user}: {exception.msg}')
+            return False
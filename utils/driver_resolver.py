@@ -0,0 +1,92 @@
+import importlib
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from utils.config import config
+from utils.logger import Logger
+
+DRIVER_MANAGERS = {
+    'chrome': ('webdriver_manager.chrome', 'ChromeDriverManager', 'driver_version'),
+    'firefox': ('webdriver_manager.firefox', 'GeckoDriverManager', 'version'),
+    'edge': ('webdriver_manager.microsoft', 'EdgeChromiumDriverManager', 'version')
+}
+
+
+class DriverResolver(object):
+    def __init__(self, manifest_path=config.DRIVER_MANIFEST_FILE_PATH):
+        self.manifest_path = Path(manifest_path)
+        self.lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='UTF-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self, manifest):
+        with tempfile.NamedTemporaryFile('w', dir=self.manifest_path.parent, suffix='.tmp', delete=False,
+                                         encoding='UTF-8') as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(file.name, self.manifest_path)
+
+    def resolve(self, browser):
+        pinned_path = config.WEBDRIVER_PATHS.get(browser)
+        if pinned_path:
+            return pinned_path
+        version = config.WEBDRIVER_VERSIONS.get(browser)
+        with self.lock:
+            manifest = self.load()
+            entry = manifest.get(browser)
+            if entry and Path(entry['path']).is_file() and (version is None or entry.get('version') == version):
+                return entry['path']
+            if config.WEBDRIVER_OFFLINE:
+                error_info = f'No cached {browser} driver in {self.manifest_path} and WEBDRIVER_OFFLINE is set'
+                Logger().error(error_info)
+                raise Exception(error_info)
+            path = self.install(browser, version)
+            manifest[browser] = {'path': path, 'version': version, 'resolved_at': datetime.now().isoformat()}
+            self.save(manifest)
+            Logger().info(f'Pinned {browser} driver {path} in {self.manifest_path}')
+            return path
+
+    def evict(self, browser):
+        with self.lock:
+            manifest = self.load()
+            if manifest.pop(browser, None) is not None:
+                self.save(manifest)
+                Logger().info(f'Evicted {browser} driver from {self.manifest_path}')
+
+    def record_browser_version(self, browser, browser_version):
+        if not browser_version or config.WEBDRIVER_PATHS.get(browser):
+            return
+        with self.lock:
+            manifest = self.load()
+            entry = manifest.get(browser)
+            if entry is None or entry.get('browser_version') == browser_version:
+                return
+            if entry.get('browser_version'):
+                Logger().info(f'{browser} updated from {entry["browser_version"]} to {browser_version}')
+            entry['browser_version'] = browser_version
+            self.save(manifest)
+
+    @staticmethod
+    def install(browser, version=None):
+        if browser not in DRIVER_MANAGERS:
+            error_info = 'Provide valid driver name'
+            Logger().error(error_info)
+            raise Exception(error_info)
+        module_name, class_name, version_argument = DRIVER_MANAGERS[browser]
+        from webdriver_manager.core.driver_cache import DriverCacheManager
+        manager_class = getattr(importlib.import_module(module_name), class_name)
+        kwargs = {'cache_manager': DriverCacheManager(root_dir=str(config.DRIVERS_DIR_PATH))}
+        if version is not None:
+            kwargs[version_argument] = version
+        return manager_class(**kwargs).install()
+
+
+driver_resolver = DriverResolver()
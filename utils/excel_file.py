@@ -1,4 +1,5 @@
-import openpyxl
+from pathlib import Path
+
 import pandas as pd
 import wcwidth
 
@@ -6,12 +7,14 @@ from utils.logger import Logger
 
 
 class ExcelFile(object):
-    def __init__(self, name, path):
+    def __init__(self, name, path, constant_memory=False):
         self.name = name
         self.path = path
+        self.constant_memory = constant_memory
 
     def __enter__(self):
-        self.writer = pd.ExcelWriter(self.path, engine='xlsxwriter')
+        engine_kwargs = {'options': {'constant_memory': True}} if self.constant_memory else None
+        self.writer = pd.ExcelWriter(self.path, engine='xlsxwriter', engine_kwargs=engine_kwargs)
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -29,44 +32,85 @@ class ExcelFile(object):
             'font_color': '#FFFFFF'
         })
         fmt_time = workbook.add_format({'num_format': 'yyyy-mm-dd'})
-        row = 1
-        for i, row_data in dataframe.iterrows():
-            for col_idx, col_value in enumerate(row_data):
-                if pd.isna(col_value):
-                    sheet.write(row, col_idx, None)
-                elif isinstance(col_value, pd.Timestamp):
-                    sheet.write_datetime(row, col_idx, col_value.to_pydatetime(), fmt_time)
-                else:
-                    col_name = dataframe.columns[col_idx]
-                    if string_columns and col_name in string_columns:
-                        sheet.write_string(row, col_idx, str(col_value))
-                    else:
-                        sheet.write(row, col_idx, col_value)
-            row += 1
+        column_writers = []
+        column_values = []
+        for col_idx, col_name in enumerate(dataframe.columns):
+            column = dataframe.iloc[:, col_idx]
+            is_string_column = bool(string_columns) and col_name in string_columns
+            column_writers.append(self.get_column_writer(sheet, column, is_string_column, fmt_time))
+            column_values.append(column.astype(object).where(column.notna(), None).tolist())
+        if self.constant_memory:
+            self.write_header(dataframe, sheet_name, header_format, set_width_by_value)
+        for row, row_values in enumerate(zip(*column_values), start=1):
+            for col_idx, col_value in enumerate(row_values):
+                if col_value is not None:
+                    column_writers[col_idx](row, col_idx, col_value)
+        if not self.constant_memory:
+            self.write_header(dataframe, sheet_name, header_format, set_width_by_value)
+
+    def write_header(self, dataframe, sheet_name, header_format, set_width_by_value):
         worksheet = self.writer.sheets[sheet_name]
         if not isinstance(dataframe.columns, pd.RangeIndex):
             columns_width = [max(len(str(col)), wcwidth.wcswidth(str(col))) + 4 for col in dataframe.columns]
             for col_idx, col_name in enumerate(dataframe.columns):
                 if set_width_by_value:
-                    max_value_length = dataframe[col_name].astype(str).str.len().max()
+                    max_value_length = self.get_max_value_length(dataframe.iloc[:, col_idx])
                     columns_width[col_idx] = max(columns_width[col_idx], max_value_length)
                 worksheet.set_column(col_idx, col_idx, columns_width[col_idx])
                 worksheet.write(0, col_idx, col_name, header_format)
 
-    def import_excel_to_dataframe(self):
-        excel_file = pd.ExcelFile(self.path)
-        visible_sheet_name = self.get_visible_sheet_name(excel_file)
-        df = pd.read_excel(excel_file, sheet_name=visible_sheet_name)
-        return df
+    @staticmethod
+    def get_column_writer(sheet, column, is_string_column, fmt_time):
+        def write_datetime(row, col, value):
+            sheet.write_datetime(row, col, value.to_pydatetime(), fmt_time)
+
+        def write_string(row, col, value):
+            if isinstance(value, pd.Timestamp):
+                write_datetime(row, col, value)
+            else:
+                sheet.write_string(row, col, str(value))
+
+        def write_value(row, col, value):
+            if isinstance(value, pd.Timestamp):
+                write_datetime(row, col, value)
+            else:
+                sheet.write(row, col, value)
+
+        if pd.api.types.is_datetime64_any_dtype(column.dtype):
+            return write_datetime
+        if is_string_column:
+            return write_string
+        if pd.api.types.is_bool_dtype(column.dtype):
+            return sheet.write_boolean
+        if pd.api.types.is_numeric_dtype(column.dtype):
+            return sheet.write_number
+        return write_value
+
+    @staticmethod
+    def get_max_value_length(column):
+        try:
+            column = column.drop_duplicates()
+        except TypeError:
+            pass
+        return column.astype(str).str.len().max()
+
+    def import_excel_to_dataframe(self, columns: list = None):
+        suffix = Path(self.path).suffix.lower()
+        if suffix == '.csv':
+            return pd.read_csv(self.path, usecols=columns, dtype=str)
+        if suffix == '.parquet':
+            return pd.read_parquet(self.path, columns=columns)
+        with pd.ExcelFile(self.path, engine='openpyxl') as excel_file:
+            visible_sheet_name = self.get_visible_sheet_name(excel_file)
+            return excel_file.parse(sheet_name=visible_sheet_name, usecols=columns)
 
     def get_visible_sheet_name(self, excel_file, index=0):
-        sheets = openpyxl.load_workbook(excel_file, read_only=True).worksheets
         visible_sheets = []
-        for sheet in sheets:
+        for sheet in excel_file.book.worksheets:
             if sheet.sheet_state != 'hidden':
                 visible_sheets.append(sheet.title)
         if len(visible_sheets) != 1:
-            error_info = f'{excel_file}: the excel file should contain only one visible sheet'
+            error_info = f'{self.path}: the excel file should contain only one visible sheet'
             Logger().error(error_info)
             raise Exception(error_info)
         return visible_sheets[index]
@@ -0,0 +1,76 @@
+import atexit
+import json
+import math
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from utils.config import config
+
+
+class LocatorLatency(object):
+    def __init__(self, path=config.LOCATOR_LATENCY_FILE_PATH, enabled=config.ADAPTIVE_TIMEOUT_ENABLED):
+        self.path = path
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.is_modified = False
+        self.latencies = self.load()
+
+    @staticmethod
+    def get_key(condition_type, locator):
+        return f'{condition_type}:{locator[0]}:{locator[1]}'
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='UTF-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        with self.lock:
+            if not self.is_modified:
+                return
+            content = json.dumps(self.latencies)
+            self.is_modified = False
+        with tempfile.NamedTemporaryFile('w', dir=Path(self.path).parent, suffix='.tmp', delete=False,
+                                         encoding='UTF-8') as file:
+            file.write(content)
+        os.replace(file.name, self.path)
+
+    def get_latency(self, key):
+        return self.latencies.setdefault(key, {'samples': [], 'timeouts': 0})
+
+    def record(self, condition_type, locator, seconds):
+        with self.lock:
+            samples = self.get_latency(self.get_key(condition_type, locator))['samples']
+            samples.append(round(seconds, 3))
+            del samples[:-config.ADAPTIVE_TIMEOUT_MAX_SAMPLES]
+            self.is_modified = True
+
+    def record_timeout(self, condition_type, locator):
+        with self.lock:
+            self.get_latency(self.get_key(condition_type, locator))['timeouts'] += 1
+            self.is_modified = True
+
+    def get_timeout(self, condition_type, locator):
+        if not self.enabled:
+            return None
+        with self.lock:
+            latency = self.latencies.get(self.get_key(condition_type, locator))
+            if latency is None:
+                return None
+            samples = sorted(latency['samples'])
+            timeouts = latency['timeouts']
+        if len(samples) < config.ADAPTIVE_TIMEOUT_MIN_SAMPLES:
+            return None
+        if timeouts > config.ADAPTIVE_TIMEOUT_MAX_TIMEOUT_RATIO * (len(samples) + timeouts):
+            return None
+        index = min(len(samples) - 1, math.ceil(config.ADAPTIVE_TIMEOUT_PERCENTILE * len(samples)) - 1)
+        timeout = samples[index] * config.ADAPTIVE_TIMEOUT_MULTIPLIER
+        return min(max(timeout, config.ADAPTIVE_TIMEOUT_FLOOR), config.ADAPTIVE_TIMEOUT_CEILING)
+
+
+locator_latency = LocatorLatency()
+atexit.register(locator_latency.save)
@@ -1,46 +1,96 @@
-import inspect
+import atexit
 import json
 import logging
 import logging.config
+import logging.handlers
 import os
+import queue
+import sys
+import threading
 import time
 from functools import wraps
 
 from utils.config import config
+from utils.metrics import metrics
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'logging_config.json')
+
+_configure_lock = threading.Lock()
+_configured_path = None
+_queue_listener = None
+_caller_names = {}
+
+
+def configure_logging(path=DEFAULT_CONFIG_PATH):
+    global _configured_path, _queue_listener
+    if _configured_path == path:
+        return
+    with _configure_lock:
+        if _configured_path == path:
+            return
+        with open(path, 'r', encoding='UTF-8') as file:
+            logging_config = json.load(file)
+        logging_config["handlers"]["info_file"]["filename"] = str(config.LOG_FILE_PATH)
+        if _queue_listener is not None:
+            _queue_listener.stop()
+            _queue_listener = None
+        logging.config.dictConfig(logging_config)
+        logging.Formatter.converter = time.localtime
+        if config.LOG_QUEUE_ENABLED:
+            root_logger = logging.getLogger()
+            handlers = root_logger.handlers[:]
+            log_queue = queue.SimpleQueue()
+            for handler in handlers:
+                root_logger.removeHandler(handler)
+            root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+            _queue_listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+            _queue_listener.start()
+        _configured_path = path
+
+
+def stop_logging():
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
+atexit.register(stop_logging)
+
+
+def get_caller_name(frame, separator='.'):
+    caller_self = frame.f_locals.get('self')
+    key = (frame.f_code, caller_self.__class__ if caller_self is not None else None, separator)
+    caller_name = _caller_names.get(key)
+    if caller_name is None:
+        if caller_self is not None:
+            caller_name = f'{caller_self.__class__.__name__}{separator}{frame.f_code.co_name}'
+        else:
+            caller_name = frame.f_globals.get('__name__', None)
+        _caller_names[key] = caller_name
+    return caller_name
 
 
 class Logger(object):
-    def __init__(self, name=None, default_path=os.path.join(os.path.dirname(__file__), 'logging_config.json'),
-                 default_level=logging.DEBUG):
+    def __init__(self, name=None, default_path=DEFAULT_CONFIG_PATH, default_level=logging.DEBUG):
         self.path = default_path
         self.level = default_level
         self.caller_name = name
         if self.caller_name is None:
             self.detect_caller_info()
-        with open(self.path, 'r', encoding='UTF-8') as file:
-            logging_config = json.load(file)
-        logging_config["handlers"]["info_file"]["filename"] = str(config.LOG_FILE_PATH)
-        self.logger = self.get_logger(f'{self.caller_name}', logging_config)
-        return
+        configure_logging(self.path)
+        self.logger = self.get_logger(f'{self.caller_name}')
 
-    def get_logger(self, name, logging_config):
-        logging.config.dictConfig(logging_config)
-        logging.Formatter.converter = time.localtime
+    def get_logger(self, name):
         logger = logging.getLogger(name)
-        logger.setLevel(self.level)
+        if logger.level != self.level:
+            logger.setLevel(self.level)
         return logger
 
     def detect_caller_info(self):
-        stack = inspect.stack()
         try:
-            caller_frame = stack[2]
-            if 'self' in caller_frame.frame.f_locals:
-                caller_class = caller_frame.frame.f_locals['self'].__class__.__name__
-                caller_method = caller_frame.frame.f_code.co_name
-                self.caller_name = f'{caller_class}.{caller_method}'
-            else:
-                self.caller_name = caller_frame.frame.f_globals.get('__name__', None)
-        except (AttributeError, IndexError):
+            self.caller_name = get_caller_name(sys._getframe(2))
+        except ValueError:
             self.caller_name = None
 
     def debug(self, msg, *args, **kwargs):
@@ -60,18 +110,23 @@ class Logger(object):
 
 
 def _step(func):
+    step_name = func.__qualname__
+
     @wraps(func)
     def wrapper(*args, **kwargs):
-        start = time.time()
-        result = func(*args, **kwargs)
-        end = time.time()
-        elapsed = (end - start) * 1000
-        stack = inspect.stack()
+        start = time.perf_counter_ns()
         try:
-            caller_class = stack[1][0].f_locals['self'].__class__.__name__
-            caller_method = stack[1][0].f_code.co_name
-            Logger(f'{caller_class}.{caller_method}.{func.__name__}').info(msg=f'{round(elapsed, 3)} ms')
-        except KeyError:
+            result = func(*args, **kwargs)
+        except BaseException:
+            metrics.observe(step_name, time.perf_counter_ns() - start, is_error=True)
+            raise
+        duration = time.perf_counter_ns() - start
+        metrics.observe(step_name, duration)
+        elapsed = duration / 1e6
+        caller_frame = sys._getframe(1)
+        if 'self' in caller_frame.f_locals:
+            Logger(f'{get_caller_name(caller_frame)}.{func.__name__}').info(msg=f'{round(elapsed, 3)} ms')
+        else:
             Logger(f'{func.__qualname__}').info(msg=f'{round(elapsed, 3)} ms')
         return result
 
@@ -0,0 +1,120 @@
+import datetime
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from utils.config import config
+
+LATENCY_BUCKETS_SECONDS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def write_atomically(path, content):
+    with tempfile.NamedTemporaryFile('w', dir=Path(path).parent, suffix='.tmp', delete=False,
+                                     encoding='UTF-8') as file:
+        file.write(content)
+    os.chmod(file.name, 0o644)
+    os.replace(file.name, path)
+
+
+class Metrics(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.durations = {}
+        self.errors = {}
+        self.counters = {}
+
+    def observe(self, name, duration_ns, is_error=False):
+        with self.lock:
+            self.durations.setdefault(name, []).append(duration_ns)
+            if is_error:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    def increment(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def reset(self):
+        with self.lock:
+            self.durations.clear()
+            self.errors.clear()
+            self.counters.clear()
+
+    def summary(self):
+        with self.lock:
+            durations = {name: sorted(values) for name, values in self.durations.items()}
+            errors = dict(self.errors)
+            counters = dict(self.counters)
+        steps = {}
+        for name, values in durations.items():
+            steps[name] = {
+                'count': len(values),
+                'errors': errors.get(name, 0),
+                'total_ms': sum(values) / 1e6,
+                'p50_ms': percentile(values, 0.5) / 1e6,
+                'p95_ms': percentile(values, 0.95) / 1e6,
+                'p99_ms': percentile(values, 0.99) / 1e6,
+                'max_ms': values[-1] / 1e6
+            }
+        return {
+            'generated_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'steps': steps,
+            'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                         for (name, labels), value in counters.items()]
+        }
+
+    def to_prometheus(self):
+        with self.lock:
+            durations = {name: list(values) for name, values in self.durations.items()}
+            errors = dict(self.errors)
+            counters = dict(self.counters)
+        lines = ['# HELP export_data_step_duration_seconds Duration of crawler steps.',
+                 '# TYPE export_data_step_duration_seconds histogram']
+        for name, values in sorted(durations.items()):
+            label = f'step="{escape_label(name)}"'
+            seconds = [value / 1e9 for value in values]
+            for bucket in LATENCY_BUCKETS_SECONDS:
+                count = sum(1 for value in seconds if value <= bucket)
+                lines.append(f'export_data_step_duration_seconds_bucket{{{label},le="{bucket}"}} {count}')
+            lines.append(f'export_data_step_duration_seconds_bucket{{{label},le="+Inf"}} {len(seconds)}')
+            lines.append(f'export_data_step_duration_seconds_sum{{{label}}} {sum(seconds)}')
+            lines.append(f'export_data_step_duration_seconds_count{{{label}}} {len(seconds)}')
+        lines += ['# HELP export_data_step_errors_total Crawler steps that raised an exception.',
+                  '# TYPE export_data_step_errors_total counter']
+        for name in sorted(durations):
+            lines.append(f'export_data_step_errors_total{{step="{escape_label(name)}"}} {errors.get(name, 0)}')
+        lines += ['# HELP export_data_events_total Crawler event counters.',
+                  '# TYPE export_data_events_total counter']
+        for (name, labels), value in sorted(counters.items()):
+            label = ','.join([f'name="{escape_label(name)}"'] +
+                             [f'{key}="{escape_label(label_value)}"' for key, label_value in labels])
+            lines.append(f'export_data_events_total{{{label}}} {value}')
+        lines += ['# HELP export_data_last_run_timestamp_seconds Time the metrics were written.',
+                  '# TYPE export_data_last_run_timestamp_seconds gauge',
+                  f'export_data_last_run_timestamp_seconds {time.time()}']
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, json_path=None, prometheus_path=config.METRICS_PROMETHEUS_FILE_PATH):
+        if json_path is None:
+            timestamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+            json_path = Path(config.METRICS_DIR_PATH, f'metrics_{timestamp}.json')
+        write_atomically(json_path, json.dumps(self.summary(), indent=2))
+        write_atomically(prometheus_path, self.to_prometheus())
+        return json_path
+
+
+metrics = Metrics()
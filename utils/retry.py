@@ -0,0 +1,91 @@
+import random
+import threading
+import time
+
+from utils.config import config
+from utils.logger import Logger
+from utils.metrics import metrics
+
+
+class RetryPolicy(object):
+    def __init__(self, attempts=1, base_delay=0, max_delay=30, jitter=0.5):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def get_delay(self, retry):
+        delay = min(self.max_delay, self.base_delay * 2 ** (retry - 1))
+        return delay * (1 - self.jitter * random.random())
+
+
+class TimeBudget(object):
+    def __init__(self):
+        self.context = threading.local()
+
+    def start(self, seconds=config.RETRY_EMAIL_TIME_BUDGET):
+        self.context.deadline = time.monotonic() + seconds
+
+    def remaining(self):
+        deadline = getattr(self.context, 'deadline', None)
+        if deadline is None:
+            return float('inf')
+        return deadline - time.monotonic()
+
+
+class CircuitBreaker(object):
+    def __init__(self, threshold=config.CIRCUIT_BREAKER_THRESHOLD, cooldown=config.CIRCUIT_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self, kind):
+        metrics.increment('portal_failure', kind=kind)
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.threshold and self.opened_at is None:
+                self.opened_at = time.monotonic()
+                metrics.increment('circuit_breaker_open')
+                Logger().warning(f'* Circuit breaker opened after {self.failures} portal failures, last: {kind}')
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def wait_if_open(self):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            pause = self.opened_at + self.cooldown - time.monotonic()
+        if pause > 0:
+            Logger().warning(f'* Circuit breaker open, pausing the crawl for {round(pause, 1)} seconds')
+            time.sleep(pause)
+        with self.lock:
+            if self.opened_at is not None and time.monotonic() >= self.opened_at + self.cooldown:
+                self.opened_at = None
+                self.failures = self.threshold - 1
+
+
+def get_policy(name):
+    return RetryPolicy(**config.RETRY_POLICIES.get(name, {}))
+
+
+def retry_attempts(name):
+    policy = get_policy(name)
+    for attempt in range(policy.attempts):
+        if attempt:
+            if time_budget.remaining() <= 0:
+                metrics.increment('retry_budget_exhausted', step=name)
+                Logger().warning(f'* Time budget exhausted, no more retries for {name}')
+                return
+            metrics.increment('retry', step=name)
+            circuit_breaker.wait_if_open()
+            time.sleep(min(policy.get_delay(attempt), max(time_budget.remaining(), 0)))
+        yield attempt
+
+
+time_budget = TimeBudget()
+circuit_breaker = CircuitBreaker()
@@ -0,0 +1,41 @@
+import json
+import os
+import threading
+
+from utils.config import config
+
+
+class RunJournal(object):
+    def __init__(self, path=config.DEVICE_LIST_JOURNAL_FILE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = self.load()
+
+    def load(self):
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, 'r+', encoding='UTF-8') as file:
+            content = file.read()
+            if content and not content.endswith('\n'):
+                file.write('\n')
+        for line in content.splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            entries[entry['email']] = entry['devices']
+        return entries
+
+    def is_completed(self, email):
+        return email in self.entries
+
+    def record(self, email, devices):
+        line = json.dumps({'email': email, 'devices': devices}, ensure_ascii=False)
+        with self.lock:
+            with open(self.path, 'a', encoding='UTF-8') as file:
+                file.write(f'{line}\n')
+            self.entries[email] = devices
+
+    def get_device_list(self, email_list):
+        return [device for email in email_list for device in self.entries.get(email, [])]
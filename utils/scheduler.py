@@ -0,0 +1,67 @@
+import datetime
+import os
+import subprocess
+import sys
+
+from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_MISSED, EVENT_SCHEDULER_STARTED
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.schedulers.blocking import BlockingScheduler
+
+from utils.config import config
+from utils.cron_selector import get_trigger
+from utils.logger import Logger
+from utils.metrics import metrics
+
+ENTRY_POINT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'export_mem_data.py')
+
+
+def run_job(job_name):
+    Logger().info(f'Starting scheduled job {job_name}')
+    completed = subprocess.run([sys.executable, ENTRY_POINT_PATH, '--jobs', job_name])
+    if completed.returncode != 0:
+        error_info = f'Scheduled job {job_name} exited with code {completed.returncode}'
+        Logger().error(error_info)
+        raise Exception(error_info)
+
+
+class JobScheduler(object):
+    def __init__(self, jobs=config.JOB_LIST):
+        self.scheduler = BlockingScheduler(
+            timezone=config.SCHEDULER_TIMEZONE,
+            executors={'default': ThreadPoolExecutor(config.SCHEDULER_MAX_WORKERS)},
+            job_defaults={
+                'coalesce': True,
+                'max_instances': 1,
+                'misfire_grace_time': config.SCHEDULER_MISFIRE_GRACE_TIME
+            })
+        for job in jobs:
+            self.scheduler.add_job(run_job, get_trigger(job['cron']), args=[job['job_name']], id=job['job_name'],
+                                   name=job['job_name'])
+        self.scheduler.add_listener(self.on_job_event, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED)
+        self.scheduler.add_listener(lambda event: self.log_next_fire_times(), EVENT_SCHEDULER_STARTED)
+
+    def get_next_fire_times(self):
+        now = datetime.datetime.now(self.scheduler.timezone)
+        return {job.id: job.next_run_time if self.scheduler.running else job.trigger.get_next_fire_time(None, now)
+                for job in self.scheduler.get_jobs()}
+
+    def log_next_fire_times(self):
+        for job_name, next_run_time in self.get_next_fire_times().items():
+            Logger().info(f'Next run of {job_name}: {next_run_time.isoformat() if next_run_time else "never"}')
+
+    def on_job_event(self, event):
+        if event.code == EVENT_JOB_MISSED:
+            metrics.increment('scheduler_job_missed', job=event.job_id)
+            Logger().warning(f'* Missed run of {event.job_id} scheduled at {event.scheduled_run_time}')
+        elif event.exception:
+            metrics.increment('scheduler_job_failed', job=event.job_id)
+        else:
+            metrics.increment('scheduler_job_executed', job=event.job_id)
+        self.log_next_fire_times()
+
+    def start(self):
+        Logger().info(f'Scheduling {len(self.scheduler.get_jobs())} job(s)')
+        try:
+            self.scheduler.start()
+        except (KeyboardInterrupt, SystemExit):
+            pass
@@ -1,42 +1,73 @@
 import datetime
-import inspect
 import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import allure
 from allure_commons.types import AttachmentType
 
 from utils.config import config
+from utils.logger import Logger
+from utils.tracer import tracer
 
 
 def detect_caller_info():
-    stack = inspect.stack()
     try:
-        caller_frame = stack[2]
-        caller_class = caller_frame.frame.f_locals['self'].__class__.__name__
-        caller_method = caller_frame.frame.f_code.co_name
+        caller_frame = sys._getframe(2)
+        caller_class = caller_frame.f_locals['self'].__class__.__name__
+        caller_method = caller_frame.f_code.co_name
         caller_name = f'{caller_class}_{caller_method}'
         return caller_name.lower()
-    except (AttributeError, IndexError):
+    except (KeyError, ValueError):
         caller_name = 'screenshot'
         return caller_name
 
 
+def write_screenshot(img_path, img):
+    with open(img_path, mode='wb') as image:
+        image.write(img)
+
+
 class Screenshot(object):
+    writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='screenshot')
+    lock = threading.Lock()
+    last_taken = {}
+    recent_taken = deque()
+
+    @staticmethod
+    def is_throttled(message):
+        now = time.monotonic()
+        with Screenshot.lock:
+            last_taken = Screenshot.last_taken.get(message)
+            if last_taken is not None and now - last_taken < config.SCREENSHOT_DEDUPLICATION_SECONDS:
+                return True
+            while Screenshot.recent_taken and now - Screenshot.recent_taken[0] >= config.SCREENSHOT_BURST_SECONDS:
+                Screenshot.recent_taken.popleft()
+            if len(Screenshot.recent_taken) >= config.SCREENSHOT_BURST_LIMIT:
+                return True
+            Screenshot.last_taken[message] = now
+            Screenshot.recent_taken.append(now)
+            return False
 
     @staticmethod
-    def take_screenshot(driver, message, test=''):
+    def take_screenshot(driver, message, test='', force=False):
+        if not force and Screenshot.is_throttled(message):
+            Logger().debug(f'Screenshot throttled: {message}')
+            return
         if test == '':
             pytest_current_test = os.environ.get('PYTEST_CURRENT_TEST')
             if pytest_current_test is not None:
                 test = os.environ.get('PYTEST_CURRENT_TEST').split(':')[-1].split(' ')[0].lower()
             else:
                 test = detect_caller_info()
-        current = datetime.datetime.utcnow().strftime('%Y%m%d%H%M%S')
+        current = datetime.datetime.utcnow().strftime('%Y%m%d%H%M%S%f')
         img_name = f'{test}_{current}.png'
         img_path = Path(config.SCREENSHOTS_DIR_PATH, img_name)
-        img = driver.get_screenshot_as_file(img_path)
-        if not img:
-            img = driver.get_screenshot_as_file(img_path)
-        with open(img_path, mode='rb') as image:
-            allure.attach(image.read(), name=message, attachment_type=AttachmentType.PNG)
+        with tracer.span('Screenshot.take_screenshot', message=message):
+            img = driver.get_screenshot_as_png()
+            allure.attach(img, name=message, attachment_type=AttachmentType.PNG)
+            Screenshot.writer.submit(write_screenshot, img_path, img)
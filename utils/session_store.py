@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from selenium.common.exceptions import WebDriverException
+
+from utils.config import config
+from utils.logger import Logger
+
+GET_STORAGE_SCRIPT = '''
+const storage = window[arguments[0]];
+const items = {};
+for (let i = 0; i < storage.length; i++) {
+    const key = storage.key(i);
+    items[key] = storage.getItem(key);
+}
+return items;
+'''
+SET_STORAGE_SCRIPT = '''
+const storage = window[arguments[0]];
+for (const [key, value] of Object.entries(arguments[1])) {
+    storage.setItem(key, value);
+}
+'''
+CDP_COOKIE_FIELDS = ['name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'sameSite', 'expires', 'priority',
+                     'sourceScheme', 'sourcePort']
+
+
+def is_chromium(driver):
+    return hasattr(driver, 'execute_cdp_cmd')
+
+
+class SessionStore(object):
+    def __init__(self, user):
+        self.user = user
+        self.path = Path(config.BROWSER_SESSIONS_DIR_PATH, f'{user}.json')
+
+    def save(self, driver):
+        if is_chromium(driver):
+            cookies = driver.execute_cdp_cmd('Network.getAllCookies', {})['cookies']
+        else:
+            cookies = driver.get_cookies()
+        session = {
+            'url': driver.current_url,
+            'cookies': cookies,
+            'local_storage': driver.execute_script(GET_STORAGE_SCRIPT, 'localStorage'),
+            'session_storage': driver.execute_script(GET_STORAGE_SCRIPT, 'sessionStorage')
+        }
+        with tempfile.NamedTemporaryFile('w', dir=self.path.parent, suffix='.tmp', delete=False,
+                                         encoding='UTF-8') as file:
+            json.dump(session, file)
+        os.chmod(file.name, 0o600)
+        os.replace(file.name, self.path)
+        Logger().info(f'Saved browser session of user {self.user} to {self.path}')
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='UTF-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def clear(self):
+        self.path.unlink(missing_ok=True)
+
+    def reset(self, driver):
+        self.clear()
+        if is_chromium(driver):
+            driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        else:
+            driver.delete_all_cookies()
+        driver.execute_script('window.localStorage.clear(); window.sessionStorage.clear();')
+
+    def restore(self, driver, url):
+        session = self.load()
+        if session is None:
+            return False
+        if is_chromium(driver):
+            cookies = [{key: value for key, value in cookie.items() if key in CDP_COOKIE_FIELDS}
+                       for cookie in session['cookies']]
+            for cookie in cookies:
+                if cookie.get('expires', -1) < 0:
+                    cookie.pop('expires', None)
+            driver.execute_cdp_cmd('Network.setCookies', {'cookies': cookies})
+            driver.get(url)
+        else:
+            driver.get(url)
+            for cookie in session['cookies']:
+                try:
+                    driver.add_cookie(cookie)
+                except WebDriverException:
+                    continue
+        driver.execute_script(SET_STORAGE_SCRIPT, 'localStorage', session['local_storage'])
+        driver.execute_script(SET_STORAGE_SCRIPT, 'sessionStorage', session['session_storage'])
+        Logger().info(f'Restored browser session of user {self.user} from {self.path}')
+        return True
@@ -0,0 +1,143 @@
+import datetime
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+
+from selenium.common.exceptions import WebDriverException
+
+from utils.config import config
+
+GET_PERFORMANCE_ENTRIES_SCRIPT = '''
+const toJSON = entry => entry.toJSON();
+const entries = {
+    timeOrigin: performance.timeOrigin,
+    navigation: performance.getEntriesByType('navigation').map(toJSON),
+    resource: performance.getEntriesByType('resource').map(toJSON)
+};
+performance.clearResourceTimings();
+performance.setResourceTimingBufferSize(2000);
+return entries;
+'''
+
+BROWSER_PID = 0
+
+
+def now_us():
+    return time.time_ns() // 1000
+
+
+class Tracer(object):
+    def __init__(self, enabled=config.TRACE_ENABLED):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.events = []
+        self.context = threading.local()
+        self.time_origins = set()
+        self.browser_tids = {}
+        self.pid = os.getpid()
+
+    def set_email(self, email):
+        self.context.email = email
+
+    def add_event(self, event):
+        with self.lock:
+            self.events.append(event)
+
+    def reset(self):
+        with self.lock:
+            self.events.clear()
+            self.time_origins.clear()
+
+    def add_span(self, name, category, start, end, args, pid=None, tid=None):
+        self.add_event({
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': start,
+            'dur': max(end - start, 0),
+            'pid': self.pid if pid is None else pid,
+            'tid': threading.get_ident() if tid is None else tid,
+            'args': args
+        })
+
+    @contextmanager
+    def span(self, name, category='crawler', **args):
+        if not self.enabled:
+            yield
+            return
+        email = getattr(self.context, 'email', None)
+        if email is not None:
+            args.setdefault('email', email)
+        start = now_us()
+        try:
+            yield
+        except BaseException as exception:
+            args['error'] = exception.__class__.__name__
+            raise
+        finally:
+            self.add_span(name, category, start, now_us(), args)
+
+    def traced(self, name=None, category='crawler'):
+        def decorator(func):
+            span_name = name or func.__qualname__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.span(span_name, category):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def record_browser_timing(self, driver, name):
+        if not self.enabled:
+            return
+        try:
+            entries = driver.execute_script(GET_PERFORMANCE_ENTRIES_SCRIPT)
+        except WebDriverException:
+            return
+        time_origin = entries['timeOrigin']
+        args = {'blade': name}
+        email = getattr(self.context, 'email', None)
+        if email is not None:
+            args['email'] = email
+        if time_origin not in self.time_origins:
+            self.time_origins.add(time_origin)
+            for entry in entries['navigation']:
+                self.add_browser_entry(entry, time_origin, 'navigation', args)
+        for entry in entries['resource']:
+            self.add_browser_entry(entry, time_origin, entry.get('initiatorType', 'resource'), args)
+
+    def add_browser_entry(self, entry, time_origin, category, args):
+        start = int((time_origin + entry['startTime']) * 1000)
+        end = start + int(entry['duration'] * 1000)
+        entry_args = dict(args, transferSize=entry.get('transferSize'))
+        with self.lock:
+            tid = self.browser_tids.setdefault(category, len(self.browser_tids) + 1)
+        self.add_span(entry['name'], category, start, end, entry_args, pid=BROWSER_PID, tid=tid)
+
+    def dump(self, path=None):
+        if path is None:
+            timestamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+            path = Path(config.LOG_FILE_PATH.parent, f'trace_{timestamp}.json')
+        with self.lock:
+            events = list(self.events)
+            browser_tids = dict(self.browser_tids)
+        metadata = [{'name': 'process_name', 'ph': 'M', 'pid': self.pid, 'args': {'name': 'crawler'}},
+                    {'name': 'process_name', 'ph': 'M', 'pid': BROWSER_PID, 'args': {'name': 'browser timing'}}]
+        metadata += [{'name': 'thread_name', 'ph': 'M', 'pid': BROWSER_PID, 'tid': tid, 'args': {'name': category}}
+                     for category, tid in browser_tids.items()]
+        with open(path, 'w', encoding='UTF-8') as file:
+            json.dump({'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}, file)
+        return path
+
+
+tracer = Tracer()
+traced = tracer.traced
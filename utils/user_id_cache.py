@@ -0,0 +1,35 @@
+import sqlite3
+import time
+from contextlib import closing
+
+from utils.config import config
+
+
+class UserIdCache(object):
+    def __init__(self, path=config.USER_ID_CACHE_FILE_PATH, ttl_hours=config.USER_ID_CACHE_TTL_HOURS,
+                 negative_ttl_hours=config.USER_ID_CACHE_NEGATIVE_TTL_HOURS):
+        self.path = path
+        self.ttl = ttl_hours * 3600
+        self.negative_ttl = negative_ttl_hours * 3600
+        with closing(self.connect()) as connection, connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS user_id ('
+                               'email TEXT PRIMARY KEY, user_id TEXT, verified_at REAL NOT NULL)')
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, email):
+        with closing(self.connect()) as connection:
+            row = connection.execute('SELECT user_id, verified_at FROM user_id WHERE email = ?', (email,)).fetchone()
+        if row is None:
+            return False, None
+        user_id, verified_at = row
+        ttl = self.ttl if user_id else self.negative_ttl
+        if time.time() - verified_at > ttl:
+            return False, None
+        return True, user_id
+
+    def set(self, email, user_id):
+        with closing(self.connect()) as connection, connection:
+            connection.execute('INSERT OR REPLACE INTO user_id (email, user_id, verified_at) VALUES (?, ?, ?)',
+                               (email, user_id, time.time()))
@@ -0,0 +1,68 @@
+import sqlite3
+import time
+from contextlib import closing
+
+from utils.config import config
+
+
+class WorkQueue(object):
+    def __init__(self, path=config.EMAIL_QUEUE_FILE_PATH):
+        self.path = path
+        with closing(self.connect()) as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS work_item ('
+                               'position INTEGER PRIMARY KEY, email TEXT UNIQUE NOT NULL, '
+                               "status TEXT NOT NULL DEFAULT 'pending', claimed_by TEXT, claimed_at REAL)")
+            connection.execute('CREATE INDEX IF NOT EXISTS work_item_status ON work_item (status, position)')
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def populate(self, email_list):
+        with closing(self.connect()) as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute('DELETE FROM work_item')
+            connection.executemany('INSERT OR IGNORE INTO work_item (email) VALUES (?)',
+                                   ((email,) for email in email_list))
+            connection.execute('COMMIT')
+
+    def __iter__(self):
+        with closing(self.connect()) as connection:
+            for email, in connection.execute('SELECT email FROM work_item ORDER BY position'):
+                yield email
+
+    def count(self, status=None):
+        with closing(self.connect()) as connection:
+            if status is None:
+                return connection.execute('SELECT COUNT(*) FROM work_item').fetchone()[0]
+            return connection.execute('SELECT COUNT(*) FROM work_item WHERE status = ?', (status,)).fetchone()[0]
+
+    def claim(self, worker, batch_size=1):
+        with closing(self.connect()) as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            rows = connection.execute("SELECT position, email FROM work_item WHERE status = 'pending' "
+                                      'ORDER BY position LIMIT ?', (batch_size,)).fetchall()
+            connection.executemany("UPDATE work_item SET status = 'claimed', claimed_by = ?, claimed_at = ? "
+                                   'WHERE position = ?', ((worker, time.time(), position) for position, _ in rows))
+            connection.execute('COMMIT')
+        return [email for _, email in rows]
+
+    def claim_iter(self, worker, batch_size=1):
+        while True:
+            email_list = self.claim(worker, batch_size)
+            if not email_list:
+                return
+            yield from email_list
+
+    def complete(self, email):
+        with closing(self.connect()) as connection:
+            connection.execute("UPDATE work_item SET status = 'done' WHERE email = ?", (email,))
+
+    def release(self, email):
+        with closing(self.connect()) as connection:
+            connection.execute("UPDATE work_item SET status = 'retry' WHERE email = ?", (email,))
+
+    def reset_claimed(self, include_retry=True):
+        statuses = ('claimed', 'retry') if include_retry else ('claimed',)
+        with closing(self.connect()) as connection:
+            connection.execute("UPDATE work_item SET status = 'pending', claimed_by = NULL, claimed_at = NULL "
+                               f"WHERE status IN ({', '.join('?' * len(statuses))})", statuses)